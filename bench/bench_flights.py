@@ -0,0 +1,113 @@
+"""
+Finavia board parse benchmark.
+
+Parses fixture boards (bench/fixtures.py) the way the flight fetchers do,
+without the network:
+
+    python3 bench/bench_flights.py
+    python3 bench/bench_flights.py --flights 600 --limits 12 200 --json
+
+For each board and limit it reports the time per call and per flight read:
+  stream  stream the whole feed into flight records
+  board   get_board(): stream until limit upcoming flights, then format rows
+  cached  get_board() again with the same body (parse result reused)
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from bench import fixtures  # noqa: E402
+from modules import flights  # noqa: E402
+from modules.httpcache import ResponseCache  # noqa: E402
+
+
+class FixtureResponse:
+    status_code = 200
+
+    def __init__(self, body):
+        self.content = body
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+
+class FixtureSession:
+    """Stands in for Sessions: every GET returns body."""
+
+    def __init__(self, body, cache=None):
+        self.body = body
+        self.cache = cache
+
+    def get(self, url, **kwargs):
+        return FixtureResponse(self.body)
+
+
+def timed(fn, repeat):
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) * 1000.0 / repeat
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--flights", type=int, default=300, help="flights per board")
+    ap.add_argument("--limits", nargs="*", type=int, default=[12, 200])
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    now = datetime.datetime.now().astimezone()
+    results = []
+    for board, url in (("dep", flights.FINAVIA_URL), ("arr", flights.ARRIVALS_URL)):
+        body = fixtures.finavia_xml(now, board, args.flights)
+        ms = timed(lambda: sum(1 for _ in flights._iter_flights(body)), args.repeat)
+        results.append({"board": board, "mode": "stream", "limit": None, "ms": ms,
+                        "us_per_flight": ms * 1000.0 / args.flights})
+
+        for limit in args.limits:
+            plain = FixtureSession(body)
+            read = []
+
+            def board_rows():
+                return flights.get_board(url, board, "key", limit, session=plain)
+
+            # flights actually read before the early stop
+            last = None
+            for i, fl in enumerate(flights._iter_flights(body)):
+                if flights._is_upcoming(fl, now):
+                    read.append(fl)
+                    last = i
+                    if len(read) >= limit:
+                        break
+            n_read = (last + 1) if len(read) >= limit else args.flights
+
+            ms = timed(board_rows, args.repeat)
+            results.append({"board": board, "mode": "board", "limit": limit, "ms": ms,
+                            "us_per_flight": ms * 1000.0 / n_read, "rows": len(board_rows())})
+
+            cached = FixtureSession(body, ResponseCache())
+            ms = timed(lambda: flights.get_board(url, board, "key", limit, session=cached), args.repeat)
+            results.append({"board": board, "mode": "cached", "limit": limit, "ms": ms,
+                            "us_per_flight": ms * 1000.0 / n_read})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'BOARD':<7}{'MODE':<8}{'LIMIT':>6}{'ms/call':>10}{'us/flight':>11}   ({args.flights} flights)")
+    for r in results:
+        limit = "-" if r["limit"] is None else r["limit"]
+        print(f"{r['board']:<7}{r['mode']:<8}{limit:>6}{r['ms']:>10.2f}{r['us_per_flight']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
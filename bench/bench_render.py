@@ -0,0 +1,140 @@
+"""
+Headless render benchmark for every view.
+
+Runs wopr.py's renderer under SDL's dummy video driver with fixture state
+(bench/fixtures.py), so it works on a laptop or CI box without a Pi:
+
+    python3 bench/bench_render.py
+    python3 bench/bench_render.py --frames 500 --effects --json
+    python3 bench/bench_render.py --palette   # 8-bit palette_mode canvas
+    python3 bench/bench_render.py --board-rows 500 --views departures
+
+Per view and mode it reports per-frame render time percentiles in ms:
+  steady  data unchanged between frames (the common case on the Pi)
+  data    state republished every frame, so the view body is re-rendered
+  cold    as data, plus empty text / row / chrome caches every frame
+  scroll  boards mid-scroll, 40 ms further along every frame
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("WOPR_CONFIG", os.path.join(ROOT, "config.json.example"))
+
+# palette_mode is read when wopr is imported, so decide it before that
+if "--palette" in sys.argv:
+    with open(os.environ["WOPR_CONFIG"]) as f:
+        _cfg = json.load(f)
+    _cfg["palette_mode"] = True
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(_cfg, f)
+    os.environ["WOPR_CONFIG"] = f.name
+
+import pygame  # noqa: E402
+
+import wopr  # noqa: E402
+from bench import fixtures  # noqa: E402
+
+VIEW_NAMES = {
+    wopr.VIEW_HSL: "hsl",
+    wopr.VIEW_WEATHER_EXT: "weather",
+    wopr.VIEW_ELECTRICITY: "energy",
+    wopr.VIEW_DEPARTURES: "departures",
+    wopr.VIEW_ARRIVALS: "arrivals",
+}
+
+MODES = ("steady", "data", "cold", "scroll")
+SCROLL_STEP_MS = 40
+
+
+def percentile(sorted_ms, pct):
+    if not sorted_ms:
+        return 0.0
+    ix = min(len(sorted_ms) - 1, int(round(pct / 100.0 * (len(sorted_ms) - 1))))
+    return sorted_ms[ix]
+
+
+def summarize(samples_ms):
+    s = sorted(samples_ms)
+    return {
+        "p50": percentile(s, 50),
+        "p90": percentile(s, 90),
+        "p99": percentile(s, 99),
+        "max": s[-1] if s else 0.0,
+        "mean": sum(s) / len(s) if s else 0.0,
+    }
+
+
+def run_view(view, mode, frames, state):
+    wopr.publish(**state)
+    wopr.dirty.invalidate()
+    wopr.render_frame(view)  # warm-up, not measured
+
+    samples = []
+    for i in range(frames):
+        if mode in ("data", "cold"):
+            wopr.publish(**state)
+        if mode == "cold":
+            wopr.text_cache.clear()
+            wopr.chrome.invalidate()
+            for table in (wopr.HSL_TABLE, wopr.DEPARTURES_TABLE, wopr.ARRIVALS_TABLE):
+                table.clear()
+        if mode == "scroll":
+            now = pygame.time.get_ticks()
+            for scroller in wopr.BOARD_SCROLLERS:
+                scroller.restart(now - scroller.hold_ms - i * SCROLL_STEP_MS)
+
+        t0 = time.perf_counter()
+        wopr.render_frame(view)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+
+        # publish() posts DATA_EVENTs; don't let the queue fill up
+        pygame.event.clear()
+
+    return summarize(samples)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--frames", type=int, default=300, help="frames per view and mode")
+    ap.add_argument("--views", nargs="*", choices=sorted(VIEW_NAMES.values()),
+                    help="only these views (default: all)")
+    ap.add_argument("--modes", nargs="*", choices=MODES, default=list(MODES))
+    ap.add_argument("--effects", action="store_true", help="enable scanlines and flicker")
+    ap.add_argument("--board-rows", type=int, help="flights/arrivals listed (default 12/10)")
+    ap.add_argument("--palette", action="store_true", help="compose on the 8-bit palette canvas")
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    wopr.cfg["show_scanlines"] = args.effects
+    wopr.cfg["enable_flicker"] = args.effects
+    state = fixtures.state(board_rows=args.board_rows)
+
+    results = []
+    for view, name in VIEW_NAMES.items():
+        if args.views and name not in args.views:
+            continue
+        for mode in args.modes:
+            stats = run_view(view, mode, args.frames, state)
+            results.append({"view": name, "mode": mode, **stats})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'VIEW':<12}{'MODE':<8}{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}   (ms/frame, {args.frames} frames)")
+    for r in results:
+        print(f"{r['view']:<12}{r['mode']:<8}{r['p50']:>8.2f}{r['p90']:>8.2f}{r['p99']:>8.2f}{r['max']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
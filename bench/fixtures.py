@@ -0,0 +1,149 @@
+"""
+Deterministic state for rendering benchmarks: what updater_loop would
+publish on a busy afternoon, without touching the network.
+"""
+import datetime
+import time
+
+from modules.electricity import classify_level
+from modules.flights import Flight
+from modules.hsl import Departure
+
+
+def weather(now):
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        "temp": -3.4,
+        "feels_like": -8.1,
+        "desc": "SNOW",
+        "trend": "v",
+        "wind_speed": 5.2,
+        "wind_dir": "220°SW",
+        "pressure": 1002,
+        "humidity": 91,
+        "clouds": 100,
+        "visibility_km": 3.2,
+        "sunrise": "08:41",
+        "sunset": "16:02",
+        "sunrise_dt": day.replace(hour=8, minute=41),
+        "sunset_dt": day.replace(hour=16, minute=2),
+        "timestamp": time.time() - 120,
+    }
+
+
+def ped_warning():
+    return {"type": "Slippery Surface", "level": "WATCH", "until": "18:00"}
+
+
+def buses(now, route, dest, first_min=2, step=3, limit=6):
+    rows = []
+    for i in range(limit):
+        dep = (now + datetime.timedelta(minutes=first_min + i * step)).timestamp()
+        late = 180 if i == 2 else 0
+        rows.append(Departure(dep - late, dep, route, dest))
+    return rows
+
+
+def flights(now, count=12):
+    rows = []
+    for i in range(count):
+        std = now + datetime.timedelta(minutes=5 * (i + 1))
+        status = ("OK", "DEL", "CAN")[i % 3]
+        newt = (std + datetime.timedelta(minutes=25)).strftime("%H:%M") if status == "DEL" else ""
+        rows.append(Flight(
+            std.strftime("%H:%M"), f"AY{100 + i}", "ARN", "A320",
+            "OH-LXA", str(10 + i), str(20 + i), f"FIN{i}A",
+            status, newt,
+        ))
+    return rows
+
+
+def arrivals(now, count=10):
+    rows = []
+    for i in range(count):
+        sta = now + datetime.timedelta(minutes=5 * (i + 1))
+        status = ("OK", "DEL", "CAN")[i % 3]
+        eta = (sta + datetime.timedelta(minutes=25)).strftime("%H:%M") if status == "DEL" else ""
+        rows.append(Flight(
+            sta.strftime("%H:%M"), f"AY{200 + i}", "CPH", "E190",
+            "OH-LKE", "--", str(30 + i), f"FIN{i}B", status, eta,
+        ))
+    return rows
+
+
+FINAVIA_NS = "http://www.finavia.fi/FlightsService.xsd"
+
+
+def finavia_xml(now, board="dep", count=300):
+    """
+    A Finavia board as the API sends it: the whole day, half of it already
+    gone, with a mix of delayed, cancelled and departed/landed flights.
+    """
+    utc = now.astimezone(datetime.timezone.utc)
+
+    def iso(minutes):
+        return (utc + datetime.timedelta(minutes=minutes)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+    gone = "Departed" if board == "dep" else "Landed"
+    sched = "sdt" if board == "dep" else "sta"
+    flights = []
+    for i in range(count):
+        m = (i - count // 2) * 4
+        prt = (gone if m < 0 else "", "", "Cancelled", "")[i % 4]
+        est = f"<est_d>{iso(m + 25)}</est_d>" if i % 4 == 1 else ""
+        flights.append(
+            f"<flight><h_apt>HEL</h_apt><fltnr>AY{100 + i}</fltnr><{sched}>{iso(m)}</{sched}>"
+            f"<sdate>{iso(m)[:10]}</sdate><acreg>OH-LX{i % 10}</acreg><actype>A320</actype>"
+            f"<mfltnr/><route_1>{('ARN', 'CPH', 'OSL', 'LHR')[i % 4]}</route_1>"
+            f"<route_n_1>Stockholm</route_n_1><park>{20 + i % 30}</park><gate>{10 + i % 20}</gate>"
+            f"<prm>{prt}</prm><prt>{prt}</prt>{est}<callsign>FIN{i}A</callsign>"
+            f"<chkarea/><bltarea/></flight>"
+        )
+    return (f'<?xml version="1.0" encoding="UTF-8"?><flights xmlns="{FINAVIA_NS}">'
+            f'<{board}><header><timestamp>{iso(0)}</timestamp></header><body>'
+            + "".join(flights) + f"</body></{board}></flights>").encode()
+
+
+def electricity(now, hours=36):
+    hour = now.replace(minute=0, second=0, microsecond=0)
+    # includes a SEVERE hour so the blink path is exercised
+    pattern = [3.1, 8.2, 12.5, 25.0, 55.3, None, 14.0, 6.6]
+    rows = []
+    for i in range(hours):
+        price = pattern[i % len(pattern)]
+        rows.append({
+            "time": hour + datetime.timedelta(hours=i),
+            "price": price,
+            "level": classify_level(price),
+            "trend": "^v-"[i % 3],
+            "is_current": i == 0,
+        })
+    prices = [r["price"] for r in rows if r["price"] is not None]
+    return {
+        "rows": rows,
+        "current_price": rows[0]["price"],
+        "current_level": rows[0]["level"],
+        "max_price": max(prices),
+        "min_price": min(prices),
+        "max_time": hour + datetime.timedelta(hours=4),
+        "min_time": hour,
+    }
+
+
+def state(now=None, board_rows=None):
+    """
+    Keyword arguments for wopr.publish(). board_rows overrides how many
+    flights and arrivals are listed (e.g. 500 for a busy hub).
+    """
+    now = now or datetime.datetime.now().astimezone()
+    return {
+        "weather": weather(now),
+        "ped_warning": ped_warning(),
+        "buses": [
+            buses(now, "615", "Rautatientori"),
+            buses(now, "562", "Lentoasema", first_min=6, step=4),
+        ],
+        "flights": flights(now, board_rows or 12),
+        "arrivals": arrivals(now, board_rows or 10),
+        "electricity": electricity(now),
+    }
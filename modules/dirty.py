@@ -0,0 +1,57 @@
+import pygame
+
+
+class DirtyTracker:
+    """
+    Works out which parts of the screen changed since the last frame.
+
+    Every blit is recorded as (rect, key), where key identifies what was drawn
+    there (e.g. text + font + color). An item that is present in exactly one
+    of the last two frames means its rect needs pushing to the display; an
+    item drawn identically in both frames costs nothing.
+    """
+
+    def __init__(self, size, full_ratio=0.6):
+        self.screen_rect = pygame.Rect((0, 0), size)
+        # above this share of the screen a single flip is cheaper than rects
+        self.full_ratio = full_ratio
+        self._prev = set()
+        self._cur = set()
+        self._full = True
+        self.full_frames = 0
+        self.partial_frames = 0
+
+    def mark(self, rect, key):
+        """Record that key was drawn into rect during this frame."""
+        self._cur.add((tuple(rect), key))
+
+    def invalidate(self):
+        """Force the next frame to be pushed as a full flip (view switch etc.)."""
+        self._full = True
+        self._cur = set()
+
+    def collect(self):
+        """
+        Finish the frame. Returns a list of rects to pass to
+        pygame.display.update(), or None when a full flip is needed.
+        """
+        rects = None
+        if not self._full:
+            changed = self._cur ^ self._prev
+            rects = [pygame.Rect(r).clip(self.screen_rect) for r, _ in changed]
+            rects = [r for r in rects if r.width and r.height]
+
+            area = sum(r.width * r.height for r in rects)
+            full_area = self.screen_rect.width * self.screen_rect.height
+            if area > full_area * self.full_ratio:
+                rects = None
+
+        if rects is None:
+            self.full_frames += 1
+        else:
+            self.partial_frames += 1
+
+        self._prev = self._cur
+        self._cur = set()
+        self._full = False
+        return rects
@@ -0,0 +1,66 @@
+import pygame
+
+from modules.layers import new_surface
+from modules.palette import dimmed
+
+
+def flicker_alpha(phase, phases=6):
+    """Overlay alpha for a flicker phase: a triangle wave between 30 and 60."""
+    return 30 + abs(phase - phases // 2) * 10
+
+
+class CRTEffects:
+    """
+    Scanlines and flicker, built once at startup.
+
+    The scanline layer is a colorkeyed, RLE-accelerated surface, so applying
+    it is a single sparse blit instead of one draw.line per row. The flicker
+    overlays are pre-built per alpha level and picked from a ring by tick.
+
+    For an 8-bit canvas pass like and its palette: flicker is then a dimmed
+    copy of the palette per phase (see flicker_palette) and no blending
+    happens at all.
+    """
+
+    def __init__(self, size, line_color, phases=6, phase_ms=50, like=None, palette=None):
+        self.size = size
+        self.phases = phases
+        self.phase_ms = phase_ms
+
+        width, height = size
+        self.scanlines = new_surface(size, like)
+        self.scanlines.fill((0, 0, 0))
+        for y in range(0, height, 2):
+            pygame.draw.line(self.scanlines, line_color, (0, y), (width, y), 1)
+        self.scanlines.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+
+        overlays = {}
+        self.ring = []
+        self.palettes = []
+        for phase in range(phases):
+            alpha = flicker_alpha(phase, phases)
+            if palette is not None:
+                self.palettes.append((alpha, dimmed(palette, 1 - alpha / 255.0)))
+                continue
+            if alpha not in overlays:
+                overlay = new_surface(size)
+                overlay.fill((0, 0, 0))
+                overlay.set_alpha(alpha)
+                overlays[alpha] = overlay
+            self.ring.append((alpha, overlays[alpha]))
+
+    def phase(self, ticks):
+        return (ticks // self.phase_ms) % self.phases
+
+    def draw_scanlines(self, target):
+        return target.blit(self.scanlines, (0, 0))
+
+    def draw_flicker(self, target, ticks):
+        """Blit the overlay for this tick. Returns its alpha level."""
+        alpha, overlay = self.ring[self.phase(ticks)]
+        target.blit(overlay, (0, 0))
+        return alpha
+
+    def flicker_palette(self, ticks):
+        """(alpha, dimmed palette) for this tick, for palette-mode flicker."""
+        return self.palettes[self.phase(ticks)]
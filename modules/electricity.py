@@ -1,5 +1,7 @@
 import datetime
-import requests
+import json
+
+from modules.httpcache import get_parsed
 
 BASE_URL = "https://sahkotin.fi/prices"
 
@@ -21,7 +23,11 @@ def classify_level(price_c):
         return "RED"
 
 
-def get_spot_prices(hours_ahead=36):
+def _parse_prices(body):
+    return json.loads(body).get("prices", [])
+
+
+def get_spot_prices(hours_ahead=36, session=None):
     """
     Fetch Finnish spot prices from sahkotin.fi, with VAT, in c/kWh.
     Returns a dict with:
@@ -47,8 +53,9 @@ def get_spot_prices(hours_ahead=36):
     """
 
     now = datetime.datetime.now(datetime.timezone.utc).astimezone()
-    # Fetch from midnight local today to cover "now + future"
-    start = now.replace(hour=0)
+    # Fetch from midnight local today to cover "now + future"; the same URL
+    # all day, so an unchanged series can come back 304
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
     # sahkotin expects ISO 8601; example uses .000Z, but docs say "local time".
     # We'll send local date/time without timezone, they handle it.
     start_str = start.strftime("%Y-%m-%dT%H:%M:%S.000Z")
@@ -56,10 +63,7 @@ def get_spot_prices(hours_ahead=36):
     url = f"{BASE_URL}?fix&vat&start={start_str}"
 
     try:
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-        raw_prices = data.get("prices", [])
+        raw_prices = get_parsed(session, url, _parse_prices, "energy", timeout=10)
     except Exception:
         return {
             "rows": [],
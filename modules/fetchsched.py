@@ -0,0 +1,126 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+
+log = logging.getLogger("updater")
+
+
+class FetchScheduler:
+    """
+    Runs each data source's fetch job when it is next due.
+
+    Deadlines live in a priority queue; run() sleeps exactly until the
+    earliest one or until refresh_now() / a finished job wakes it, then
+    hands due jobs to a worker pool (one in flight per source). After a
+    job finishes its source is due again after interval() seconds, give or
+    take jitter, so sources polled at the same rate drift apart instead of
+    always hitting the network together. A source whose when() is false
+    stays due and is checked again every recheck seconds, so it's fetched
+    right after e.g. the screen comes back on.
+    """
+
+    def __init__(self, pool, jitter=0.1, recheck=1.0):
+        self.pool = pool
+        self.jitter = jitter
+        self.recheck = recheck
+        self._cond = threading.Condition()
+        self._heap = []                 # (due, seq, source); stale if due != self._due[source]
+        self._seq = itertools.count()
+        self._due = {}
+        self._jobs = {}                 # source -> (job, interval, when)
+        self._running = set()
+        self._again = set()             # refresh requested while running
+        self._pass = set()              # sources of the last refresh_now() not yet back
+        self._pass_started = set()
+
+    def add(self, source, job, interval, when=None):
+        """
+        Register a source. interval() gives the seconds between fetches;
+        when(), if given, must be true for the job to run (until it is, the
+        source stays due). Due immediately.
+        """
+        with self._cond:
+            self._jobs[source] = (job, interval, when)
+            self._schedule(source, time.monotonic())
+
+    def _schedule(self, source, due):
+        self._due[source] = due
+        heapq.heappush(self._heap, (due, next(self._seq), source))
+        self._cond.notify()
+
+    def _next_due(self, source, now):
+        interval = self._jobs[source][1]()
+        return now + interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def refresh_now(self, sources=None):
+        """Fetch these sources (default: all) as soon as possible."""
+        with self._cond:
+            sources = set(self._jobs if sources is None else sources)
+            self._pass |= sources
+            now = time.monotonic()
+            for source in sources:
+                if source in self._running:
+                    self._again.add(source)
+                else:
+                    self._schedule(source, now)
+
+    def refreshing(self):
+        """True until every source of the last refresh_now() has reported back."""
+        with self._cond:
+            return bool(self._pass)
+
+    def queue(self):
+        """(source, seconds until due or None while running) in due order."""
+        now = time.monotonic()
+        with self._cond:
+            rows = [(source, None if source in self._running else due - now)
+                    for source, due in self._due.items()]
+        return sorted(rows, key=lambda r: -1 if r[1] is None else r[1])
+
+    def _take_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            t, _, source = heapq.heappop(self._heap)
+            if self._due.get(source) == t and source not in self._running:
+                due.append(source)
+        return due
+
+    def run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    due = self._take_due(now)
+                    if due:
+                        break
+                    self._cond.wait(self._heap[0][0] - now if self._heap else None)
+
+                for source in due:
+                    job, interval, when = self._jobs[source]
+                    if when is not None and not when():
+                        self._pass.discard(source)
+                        self._schedule(source, now + self.recheck)
+                        continue
+                    self._running.add(source)
+                    if source in self._pass:
+                        self._pass_started.add(source)
+                    future = self.pool.submit(job)
+                    future.add_done_callback(lambda f, source=source: self._finished(source, f))
+
+    def _finished(self, source, future):
+        if future.exception() is not None:
+            log.warning("%s fetch failed: %r", source, future.exception())
+        with self._cond:
+            self._running.discard(source)
+            if source in self._pass_started:
+                self._pass_started.discard(source)
+                self._pass.discard(source)
+            now = time.monotonic()
+            if source in self._again:
+                self._again.discard(source)
+                self._schedule(source, now)
+            else:
+                self._schedule(source, self._next_due(source, now))
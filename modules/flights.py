@@ -1,15 +1,35 @@
-import requests
 import datetime
+import io
 import xml.etree.ElementTree as ET
 import time
 import logging
+from collections import namedtuple
+from functools import lru_cache
+
+from modules.httpcache import get_parsed
 
 FINAVIA_URL = "https://apigw.finavia.fi/flights/public/v0/flights/dep"
+ARRIVALS_URL = "https://apigw.finavia.fi/flights/public/v0/flights/arr"
 
 logger = logging.getLogger("flights")
 
+# later than scheduled by more than this and a flight shows as DEL
+DELAY_MIN = 2
+
+# One board row, departures and arrivals alike: route is the destination
+# or origin, new_time the estimate as HH:MM.
+Flight = namedtuple("Flight", "time flight route actype reg gate stand callsign status new_time")
+
+# The feed fields the boards use, as read from one <flight>. Both boards
+# name them the same (est_d is the estimate for arrivals too); arrivals
+# also have sta, which is preferred over sdt.
+_Fields = namedtuple("_Fields", "fltnr sdt sta act_d est_d prt route_1 actype acreg gate park callsign")
 
+
+@lru_cache(maxsize=2048)
 def _parse_dt(t):
+    # cached: each time is checked when streaming and again when formatting,
+    # and most are the same from one poll to the next
     if not t:
         return None
     try:
@@ -18,9 +38,95 @@ def _parse_dt(t):
         return None
 
 
-def get_flights(api_key, limit=12, retries=1, backoff=1.0, debug=False):
+@lru_cache(maxsize=4)
+def _tags(ns):
+    # namespaced tag names, worked out once per namespace
+    return ns + "flight", {ns + name: i for i, name in enumerate(_Fields._fields)}
+
+
+def _iter_flights(body):
+    """
+    A _Fields for each <flight>, streamed from the response bytes. Each
+    flight is cleared once read, so the tree never holds more than one.
+    """
+    flight = None
+    for _, el in ET.iterparse(io.BytesIO(body)):
+        if flight is None:
+            # first end event is a field of the first flight; learn the namespace
+            flight, positions = _tags(el.tag[:el.tag.index("}") + 1] if el.tag.startswith("{") else "")
+        if el.tag == flight:
+            values = [None] * len(positions)
+            for child in el:
+                i = positions.get(child.tag)
+                if i is not None and child.text and values[i] is None:
+                    values[i] = child.text.strip()
+            yield _Fields._make(values)
+            el.clear()
+
+
+def _scheduled(fl):
+    return _parse_dt(fl.sta or fl.sdt)
+
+
+def _is_upcoming(fl, now):
+    status = (fl.prt or "").upper()
+    if status.startswith("DEPART") or status == "LANDED":
+        return False
+    actual = _parse_dt(fl.act_d)
+    if actual and actual < now:
+        return False
+    scheduled = _scheduled(fl)
+    return scheduled is not None and scheduled >= now
+
+
+def _upcoming(body, now, limit):
+    """
+    The first limit flights still to come at now, and whether the feed
+    ran out before that (if not, the rest of it was never parsed).
+    """
+    out = []
+    for fl in _iter_flights(body):
+        if _is_upcoming(fl, now):
+            out.append(fl)
+            if len(out) >= limit:
+                return out, False
+    return out, True
+
+
+def _covers(parsed, now, limit):
+    # a result cut short at limit is only good while limit of it are still to come
+    flights, complete = parsed
+    return complete or sum(1 for fl in flights if _is_upcoming(fl, now)) >= limit
+
+
+def _row(fl):
+    scheduled = _scheduled(fl)
+    est = _parse_dt(fl.est_d)
+    new_time = est.strftime("%H:%M") if est else ""
+
+    if (fl.prt or "").upper().startswith("CANCEL"):
+        status = "CAN"
+        new_time = ""
+    elif est and (est - scheduled).total_seconds() > DELAY_MIN * 60:
+        status = "DEL"
+    else:
+        status = "OK"
+
+    return Flight(
+        scheduled.strftime("%H:%M"),
+        fl.fltnr or "UNK", fl.route_1 or "UNK", fl.actype or "UNK", fl.acreg or "UNK",
+        fl.gate or "--", fl.park or "--", fl.callsign or "----",
+        status, new_time,
+    )
+
+
+def get_board(url, source, api_key, limit=12, retries=0, backoff=1.0, session=None):
+    """
+    The next limit flights on one Finavia board (FINAVIA_URL or
+    ARRIVALS_URL) as Flights, or a one-line message.
+    """
     if not api_key:
-        return [("N/A", "NO_KEY", "", "", "", "", "", "", "ERROR")]
+        return ["No API key"]
 
     headers = {
         "Accept": "application/xml",
@@ -31,227 +137,30 @@ def get_flights(api_key, limit=12, retries=1, backoff=1.0, debug=False):
     last_err = None
     while attempt <= retries:
         try:
-            r = requests.get(FINAVIA_URL, headers=headers, timeout=10)
-            r.raise_for_status()
-            root = ET.fromstring(r.text)
-
-            # detect namespace
-            ns = ""
-            if root.tag.startswith("{"):
-                ns = root.tag.split("}")[0].strip("{")
-            ns_map = {"f": ns} if ns else {}
-
-            flights_out = []
             now = datetime.datetime.now().astimezone()
+            flights, _ = get_parsed(
+                session, url, lambda body: _upcoming(body, now, limit), source,
+                fresh=lambda parsed: _covers(parsed, now, limit),
+                headers=headers, timeout=10)
 
-            for fl in root.findall(".//f:flight" if ns else ".//flight", ns_map):
-
-                def _get(tag):
-                    if ns:
-                        el = fl.find(f"{{{ns}}}{tag}")
-                    else:
-                        el = fl.find(tag)
-                    return el.text.strip() if el is not None and el.text else None
-
-                sdt = _get("sdt")
-                scheduled = _parse_dt(sdt)
-
-                actual = _parse_dt(_get("act_d"))
-                status = (_get("prt") or "").upper()
-
-                # Skip past flights
-                if status.startswith("DEPART"):
-                    continue
-                if actual and actual < now:
-                    continue
-                if scheduled and scheduled < now:
-                    continue
-
-                time_str = scheduled.strftime("%H:%M") if scheduled else "??:??"
-
-                fltnr = _get("fltnr") or "UNK"
-                dest = _get("route_1") or "UNK"
-                actype = _get("actype") or "UNK"
-                acreg = _get("acreg") or "UNK"
-                gate = _get("gate") or "--"
-                park = _get("park") or "--"
-                callsign = _get("callsign") or "----"
-
-                # Determine status + estimated time
-                est = _parse_dt(_get("est_d"))
-                new_time_str = est.strftime("%H:%M") if est else ""
-
-                if status.startswith("CANCEL"):
-                    status_code = "CAN"
-                elif est and scheduled and est > scheduled:
-                    status_code = "DEL"
-                else:
-                    status_code = "OK"
-
-                flights_out.append((
-                    time_str, fltnr, dest, actype,
-                    acreg, gate, park, callsign,
-                    status_code, new_time_str
-                ))
-
-            if not flights_out:
-                return [("-----", "NO DATA", "", "", "", "", "", "", "EMPTY")]
-
-            return flights_out[:limit]
+            rows = [_row(fl) for fl in flights if _is_upcoming(fl, now)][:limit]
+            return rows or ["No flight data"]
 
         except Exception as e:
             last_err = str(e)
 
         attempt += 1
-        time.sleep(backoff)
-
-    return [("ERR", last_err, "", "", "", "", "", "", "ERROR")]
+        if attempt <= retries:
+            time.sleep(backoff)
 
-def get_arrivals(api_key, limit=10):
-    """
-    Fetch upcoming arrivals for HEL using Finavia's public API.
-    Returns a list of rows:
-      [time, flt, origin, type, reg, stand, callsign, status, new_time]
-    """
+    return [f"Err: {last_err}"]
 
-    if not api_key:
-        return ["No API key"]
 
-    url = "https://apigw.finavia.fi/flights/public/v0/flights/arr"
-    headers = {"app_key": api_key}
+def get_flights(api_key, limit=12, retries=0, backoff=1.0, debug=False, session=None):
+    """Upcoming departures from HEL."""
+    return get_board(FINAVIA_URL, "departures", api_key, limit, retries, backoff, session)
 
-    try:
-        r = requests.get(url, headers=headers, timeout=10)
-        r.raise_for_status()
-        xml_text = r.text
-
-        root = ET.fromstring(xml_text)
-
-        # Handle XML namespace like we did for departures
-        tag = root.tag  # e.g. "{http://www.finavia.fi/FlightsService.xsd}flights"
-        if tag.startswith("{"):
-            ns_uri = tag.split("}")[0].strip("{")
-            ns = {"f": ns_uri}
-        else:
-            ns = {}
-
-        arrivals = []
-
-        now_utc = datetime.datetime.now(datetime.timezone.utc)
-
-        # <flights><arr><body><flight>...</flight>
-        if ns:
-            flight_path = ".//f:arr/f:body/f:flight"
-        else:
-            flight_path = ".//arr/body/flight"
-
-        for fl in root.findall(flight_path, ns):
-            # --- TIME (STA preferred, fallback sdt) ---
-            sta_elem = fl.find("f:sta", ns) if ns else fl.find("sta")
-            sdt_elem = fl.find("f:sdt", ns) if ns else fl.find("sdt")
-
-            t_raw = None
-            if sta_elem is not None and sta_elem.text:
-                t_raw = sta_elem.text
-            elif sdt_elem is not None and sdt_elem.text:
-                t_raw = sdt_elem.text
-
-            if not t_raw:
-                # No time, skip
-                continue
-
-            try:
-                dt_utc = datetime.datetime.fromisoformat(
-                    t_raw.replace("Z", "+00:00")
-                )
-                # Filter past arrivals
-                if dt_utc < now_utc:
-                    continue
-                dt_local = dt_utc.astimezone()
-                t_str = dt_local.strftime("%H:%M")
-            except Exception:
-                t_str = ""
-                dt_local = None
-
-            # --- BASIC FIELDS ---
-            def get_text(tag_name):
-                if ns:
-                    elem = fl.find(f"f:{tag_name}", ns)
-                else:
-                    elem = fl.find(tag_name)
-                return elem.text.strip() if elem is not None and elem.text else ""
-
-            flt   = get_text("fltnr") or "UNK"
-            origin = get_text("route_1") or "UNK"
-            ac    = get_text("actype") or "UNK"
-            reg   = get_text("acreg") or ""
-            stand = get_text("park") or ""
-            call  = get_text("callsign") or ""
-
-            # --- STATUS / DELAYS ---
-            prt = get_text("prt")
-
-            # If flight already landed → do not show
-            if prt == "Landed":
-                continue
-
-            status = "OK"
-            new_time = ""
-
-            dt_now = datetime.datetime.now(datetime.timezone.utc)
-
-            # Estimated arrival time (ETA)
-            est_a_raw = get_text("est_d")
-            if est_a_raw:
-                try:
-                    dt_est_utc = datetime.datetime.fromisoformat(
-                        est_a_raw.replace("Z", "+00:00")
-                    )
-                    dt_est_local = dt_est_utc.astimezone()
-                    new_time = dt_est_local.strftime("%H:%M")
-
-                    # delay check (> 2 minutes)
-                    diff_min = (dt_est_utc - dt_utc).total_seconds() / 60.0
-                    if diff_min > 2:
-                        status = "DEL"
-                except Exception:
-                    new_time = ""
-            else:
-                new_time = ""
-
-            # Cancelled check — FINAVIA uses e.g. "Cancelled"
-            if prt == "Cancelled":  
-                status = "CAN"
-                new_time = ""
-
-            # Filtering rule:
-            # keep if still upcoming OR delayed even if scheduled has passed
-            keep = (
-                dt_utc >= dt_now or
-                status == "DEL"
-            )
-
-            if not keep:
-                continue
-
-            # Row layout must match what wopr.py expects
-            arrivals.append([
-                t_str,    # time
-                flt,      # flight number
-                origin,   # origin airport
-                ac,       # aircraft type
-                reg,      # registration
-                stand,    # stand/park
-                call,     # callsign
-                status,   # OK / DEL / CAN
-                new_time # raw estimated time if delayed
-            ])
-
-        if not arrivals:
-            return ["No arrival data"]
-
-        return arrivals[:limit]
-
-    except Exception as e:
-        return [f"Err: {e}"]
 
+def get_arrivals(api_key, limit=10, session=None):
+    """Upcoming arrivals to HEL."""
+    return get_board(ARRIVALS_URL, "arrivals", api_key, limit, session=session)
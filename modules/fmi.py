@@ -1,7 +1,9 @@
-import requests
+import io
 import xml.etree.ElementTree as ET
 from datetime import datetime, timezone
 
+from modules.httpcache import get_parsed
+
 CAP_FEED = "https://alerts.fmi.fi/cap/feed/atom_fi-FI.xml"
 
 # Keywords indicating pedestrian hazards
@@ -14,7 +16,41 @@ HAZARD_KEYWORDS = [
     "dry snow on ice",
 ]
 
-def get_pedestrian_warning(area_code):
+ATOM_ENTRY = "{http://www.w3.org/2005/Atom}entry"
+CAP = "{urn:oasis:names:tc:emergency:cap:1.2}"
+
+
+def _find_hazard(body, area_code):
+    """
+    (area_code, (headline, severity, expires) of the first pedestrian
+    hazard entry for area_code, or None). Streams the feed entry by entry
+    and stops at the first match instead of building the whole tree.
+    """
+    entry = None
+    for event, el in ET.iterparse(io.BytesIO(body), events=("start", "end")):
+        if event == "start":
+            if el.tag == ATOM_ENTRY:
+                entry = {"codes": []}
+            continue
+        if entry is None:
+            continue
+
+        if el.tag == CAP + "geocode":
+            entry["codes"].extend(c.text or "" for c in el)
+        elif el.tag in (CAP + "headline", CAP + "severity", CAP + "expires"):
+            entry.setdefault(el.tag[len(CAP):], el.text or "")
+        elif el.tag == ATOM_ENTRY:
+            headline = entry.get("headline", "").lower()
+            if (any(area_code in c for c in entry["codes"])
+                    and any(k in headline for k in HAZARD_KEYWORDS)):
+                severity = entry["severity"].upper() if "severity" in entry else "UNKNOWN"
+                return area_code, (headline, severity, entry.get("expires"))
+            entry = None
+            el.clear()
+    return area_code, None
+
+
+def get_pedestrian_warning(area_code, session=None):
     """
     Returns warning dict or None:
     {
@@ -24,37 +60,20 @@ def get_pedestrian_warning(area_code):
     }
     """
     try:
-        r = requests.get(CAP_FEED, timeout=10)
-        r.raise_for_status()
-        root = ET.fromstring(r.text)
-
-        ns = {
-            "atom": "http://www.w3.org/2005/Atom",
-            "cap": "urn:oasis:names:tc:emergency:cap:1.2"
-        }
-
-        for entry in root.findall("atom:entry", ns):
-            # check area
-            geos = entry.findall(".//cap:geocode", ns)
-            if not any(area_code in (c.text or "") for g in geos for c in g):
-                continue
-
-            # headline text
-            headline_elem = entry.find(".//cap:headline", ns)
-            headline = headline_elem.text.lower() if headline_elem is not None else ""
-            if not any(k in headline for k in HAZARD_KEYWORDS):
-                continue
+        _, hazard = get_parsed(
+            session, CAP_FEED, lambda body: _find_hazard(body, area_code), "fmi",
+            fresh=lambda parsed: parsed[0] == area_code, timeout=10)
+
+        if hazard is not None:
+            headline, severity, expires = hazard
 
             # severity mapping
-            sev_elem = entry.find(".//cap:severity", ns)
-            severity = sev_elem.text.upper() if sev_elem is not None else "UNKNOWN"
             level = "DANGER" if severity in ("SEVERE", "EXTREME") else "WATCH"
 
             # expiration
-            exp_elem = entry.find(".//cap:expires", ns)
             until_str = None
-            if exp_elem is not None:
-                dt = datetime.fromisoformat(exp_elem.text.replace("Z", "+00:00"))
+            if expires is not None:
+                dt = datetime.fromisoformat(expires.replace("Z", "+00:00"))
                 local = dt.astimezone()
                 until_str = local.strftime("%H:%M")
 
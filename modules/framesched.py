@@ -0,0 +1,64 @@
+import pygame
+
+
+def next_phase(now_ms, period_ms):
+    """Ticks at which an animation with period_ms phases next changes."""
+    return (now_ms // period_ms + 1) * period_ms
+
+
+class FrameScheduler:
+    """
+    Sleeps until the screen actually needs to change, instead of a fixed tick.
+
+    While drawing a frame, whatever animates registers when it next changes
+    (clock second, flicker phase, blink phase, new data...). wait() then
+    blocks in pygame.event.wait() until the earliest of those deadlines, so
+    any input event still wakes the loop immediately.
+    """
+
+    def __init__(self, min_frame_ms=100, max_sleep_ms=1000):
+        self.min_frame_ms = min_frame_ms
+        self.max_sleep_ms = max_sleep_ms
+        self._next = 0
+        self._frame_start = -min_frame_ms
+        self.frames = 0
+        self.idle_frames = 0
+        self.slept_ms = 0
+
+    def begin_frame(self, now_ms):
+        self._frame_start = now_ms
+        self._next = now_ms + self.max_sleep_ms
+        self.frames += 1
+
+    def request_at(self, t_ms):
+        """Ask for a frame no later than t_ms (pygame ticks)."""
+        if t_ms < self._next:
+            self._next = t_ms
+
+    def request_in(self, delay_ms):
+        self.request_at(pygame.time.get_ticks() + delay_ms)
+
+    def request_now(self):
+        self._next = 0
+
+    def idle_until(self, t_ms):
+        """
+        Nothing on screen will change before t_ms: sleep until then (or the
+        next input event), even past max_sleep_ms.
+        """
+        self._next = t_ms
+        self.idle_frames += 1
+
+    def wait(self):
+        """Block until the next frame is due or an event arrives; return events."""
+        now = pygame.time.get_ticks()
+        due = max(self._next, self._frame_start + self.min_frame_ms)
+        timeout = due - now
+        if timeout <= 0:
+            return pygame.event.get()
+
+        ev = pygame.event.wait(timeout)
+        self.slept_ms += pygame.time.get_ticks() - now
+        if ev.type == pygame.NOEVENT:
+            return []
+        return [ev] + pygame.event.get()
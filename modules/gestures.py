@@ -0,0 +1,125 @@
+import math
+from collections import namedtuple
+
+import pygame
+
+TAP = "tap"
+DOUBLE_TAP = "double_tap"
+SWIPE_LEFT = "swipe_left"
+SWIPE_RIGHT = "swipe_right"
+LONG_PRESS = "long_press"
+
+# pos in screen pixels; t is the perf_counter() time the deciding input was
+# seen, so the main loop can measure touch-to-redraw latency
+Gesture = namedtuple("Gesture", "kind pos t")
+
+
+class GestureRecognizer:
+    """
+    Turns raw finger (or mouse) events into gestures, one touch at a time.
+
+      tap         down + up without moving, shorter than long_press_ms
+      double_tap  a second tap within double_tap_ms and double_tap_px of
+                  the first (reported instead of its tap)
+      swipe       horizontal move of at least swipe_px, mostly sideways
+      long_press  held still for long_press_ms; fires while still held,
+                  from poll(), so the main loop must wake at next_deadline()
+
+    Taps are reported on release right away rather than after the
+    double-tap window, so a single tap never waits.
+    """
+
+    def __init__(self, size, double_tap_ms=400, long_press_ms=700,
+                 swipe_px=80, slop_px=20, double_tap_px=60):
+        self.width, self.height = size
+        self.double_tap_ms = double_tap_ms
+        self.long_press_ms = long_press_ms
+        self.swipe_px = swipe_px
+        self.slop_px = slop_px
+        self.double_tap_px = double_tap_px
+
+        self._down = None       # (pos, ticks) of the touch in progress
+        self._pos = None        # its latest position
+        self._moved = False
+        self._pressed = False   # long press already fired for this touch
+        self._ignore = False    # swallow this touch (e.g. it woke the screen)
+        self._last_tap = None   # (pos, ticks) of the previous tap
+
+    def _finger_pos(self, ev):
+        return (int(ev.x * self.width), int(ev.y * self.height))
+
+    def cancel(self):
+        """Ignore the touch in progress until it is lifted."""
+        self._ignore = True
+        self._last_tap = None
+
+    def feed(self, ev, now_ms, t):
+        """Handle one event; returns the gestures it completes (maybe none)."""
+        # SDL also synthesizes mouse events from touches; only use the fingers
+        if ev.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION):
+            if getattr(ev, "touch", False):
+                return []
+
+        if ev.type == pygame.FINGERDOWN or (ev.type == pygame.MOUSEBUTTONDOWN and ev.button == 1):
+            pos = self._finger_pos(ev) if ev.type == pygame.FINGERDOWN else ev.pos
+            self._down = (pos, now_ms)
+            self._pos = pos
+            self._moved = False
+            self._pressed = False
+            return []
+
+        if self._down is None:
+            return []
+
+        if ev.type == pygame.FINGERMOTION or ev.type == pygame.MOUSEMOTION:
+            self._pos = self._finger_pos(ev) if ev.type == pygame.FINGERMOTION else ev.pos
+            if math.dist(self._pos, self._down[0]) > self.slop_px:
+                self._moved = True
+            return []
+
+        if ev.type == pygame.FINGERUP or (ev.type == pygame.MOUSEBUTTONUP and ev.button == 1):
+            pos = self._finger_pos(ev) if ev.type == pygame.FINGERUP else ev.pos
+            return self._release(pos, now_ms, t)
+
+        return []
+
+    def _release(self, pos, now_ms, t):
+        (x0, y0), down_ms = self._down
+        self._down = None
+        if self._ignore or self._pressed:
+            self._ignore = False
+            return []
+
+        dx, dy = pos[0] - x0, pos[1] - y0
+        if abs(dx) >= self.swipe_px and abs(dx) > 2 * abs(dy):
+            self._last_tap = None
+            return [Gesture(SWIPE_LEFT if dx < 0 else SWIPE_RIGHT, pos, t)]
+
+        if self._moved or math.dist(pos, (x0, y0)) > self.slop_px:
+            return []
+        if now_ms - down_ms >= self.long_press_ms:
+            return []
+
+        last = self._last_tap
+        if (last is not None and now_ms - last[1] <= self.double_tap_ms
+                and math.dist(pos, last[0]) <= self.double_tap_px):
+            self._last_tap = None
+            return [Gesture(DOUBLE_TAP, pos, t)]
+
+        self._last_tap = (pos, now_ms)
+        return [Gesture(TAP, pos, t)]
+
+    def poll(self, now_ms, t):
+        """Gestures that fire on time alone (long press)."""
+        if (self._down is None or self._moved or self._pressed or self._ignore
+                or now_ms - self._down[1] < self.long_press_ms):
+            return []
+        self._pressed = True
+        self._last_tap = None
+        return [Gesture(LONG_PRESS, self._pos, t)]
+
+    def next_deadline(self):
+        """Tick at which poll() may fire, or None."""
+        if self._down is None or self._moved or self._pressed or self._ignore:
+            return None
+        return self._down[1] + self.long_press_ms
@@ -0,0 +1,236 @@
+"""
+Offline HSL timetable from the static GTFS feed (hsl.zip from
+https://infopalvelut.storage.hsldev.com/gtfs/hsl.zip).
+
+Only the stops on the board are indexed, so the index stays small even
+though the feed itself is hundreds of MB:
+
+    python3 -m modules.gtfs hsl.zip hsl_gtfs.idx HSL:1234567 HSL:2345678
+"""
+import csv
+import datetime
+import io
+import os
+import pickle
+import sys
+import time
+import zipfile
+from array import array
+from bisect import bisect_left
+
+from modules.hsl import Departure
+
+INDEX_VERSION = 1
+
+
+def _secs(hms):
+    # GTFS times go past 24:00:00 for trips that started the day before
+    h, m, s = hms.split(":")
+    return int(h) * 3600 + int(m) * 60 + int(s)
+
+
+def _rows(zf, name):
+    with zf.open(name) as f:
+        yield from csv.DictReader(io.TextIOWrapper(f, encoding="utf-8-sig"))
+
+
+def _gtfs_stop_id(stop_id):
+    # "HSL:1234567" -> "1234567"
+    return stop_id.split(":", 1)[-1]
+
+
+def _headsign(text):
+    return text.split(",")[0].split("/")[0]
+
+
+def service_day(date):
+    """Epoch seconds GTFS times on date count from: noon minus 12 h, local time."""
+    return int(time.mktime((date.year, date.month, date.day, 12, 0, 0, 0, 0, -1))) - 43200
+
+
+def build_index(zip_path, stop_ids):
+    """
+    Read the feed once and keep, per stop and service_id, the departure
+    times (s after the service day starts) sorted, with the trip of each.
+    """
+    wanted = {_gtfs_stop_id(s): s for s in stop_ids if s}
+    with zipfile.ZipFile(zip_path) as zf:
+        names = set(zf.namelist())
+
+        found = {}      # trip_id -> [(stop_id, secs, headsign)]
+        for row in _rows(zf, "stop_times.txt"):
+            stop = wanted.get(row["stop_id"])
+            if stop is not None and row["departure_time"]:
+                found.setdefault(row["trip_id"], []).append(
+                    (stop, _secs(row["departure_time"]), row.get("stop_headsign", "")))
+
+        routes = {}
+        for row in _rows(zf, "routes.txt"):
+            routes[row["route_id"]] = row["route_short_name"] or row["route_long_name"]
+
+        calls = []      # (gtfs trip id, route, headsign), one per stop served
+        per_stop = {}   # stop id -> service_id -> [(secs, call index)]
+        for row in _rows(zf, "trips.txt"):
+            stops_served = found.get(row["trip_id"])
+            if not stops_served:
+                continue
+            for stop, secs, stop_headsign in stops_served:
+                calls.append((row["trip_id"], routes.get(row["route_id"], ""),
+                              _headsign(stop_headsign or row.get("trip_headsign", ""))))
+                per_stop.setdefault(stop, {}).setdefault(row["service_id"], []).append(
+                    (secs, len(calls) - 1))
+
+        calendar = {}   # service_id -> (start, end, weekday flags)
+        if "calendar.txt" in names:
+            for row in _rows(zf, "calendar.txt"):
+                days = tuple(row[d] == "1" for d in ("monday", "tuesday", "wednesday", "thursday",
+                                                     "friday", "saturday", "sunday"))
+                calendar[row["service_id"]] = (row["start_date"], row["end_date"], days)
+
+        exceptions = {}  # "YYYYMMDD" -> {service_id: added?}
+        if "calendar_dates.txt" in names:
+            for row in _rows(zf, "calendar_dates.txt"):
+                exceptions.setdefault(row["date"], {})[row["service_id"]] = row["exception_type"] == "1"
+
+    stops = {}      # stop id -> service_id -> (departure secs, call index)
+    for stop, services in per_stop.items():
+        stops[stop] = {}
+        for service, deps in services.items():
+            deps.sort()
+            stops[stop][service] = (array("i", (d for d, _ in deps)), array("i", (t for _, t in deps)))
+
+    feed = next((s.split(":", 1)[0] for s in stop_ids if s and ":" in s), "HSL")
+    return {
+        "version": INDEX_VERSION,
+        "source": _source_key(zip_path, stop_ids),
+        "feed": feed,
+        "calls": calls,
+        "stops": stops,
+        "calendar": calendar,
+        "exceptions": exceptions,
+    }
+
+
+def _source_key(zip_path, stop_ids):
+    st = os.stat(zip_path)
+    return (st.st_size, int(st.st_mtime), tuple(sorted(s for s in stop_ids if s)))
+
+
+class Timetable:
+    """Next departures at a stop from a build_index() index."""
+
+    def __init__(self, index):
+        self.feed = index["feed"]
+        self.calls = index["calls"]
+        self.stops = index["stops"]
+        self.calendar = index["calendar"]
+        self.exceptions = index["exceptions"]
+        self._services = {}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls(pickle.load(f))
+
+    @classmethod
+    def load_or_build(cls, index_path, zip_path, stop_ids):
+        """
+        The index at index_path, rebuilt first if zip_path (when there is
+        one) or the stops changed.
+        """
+        index = None
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as f:
+                index = pickle.load(f)
+        if zip_path and os.path.exists(zip_path) and (index is None or index.get("version") != INDEX_VERSION
+                         or index.get("source") != _source_key(zip_path, stop_ids)):
+            index = build_index(zip_path, stop_ids)
+            tmp = index_path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(index, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, index_path)
+        if index is None:
+            raise FileNotFoundError(index_path)
+        return cls(index)
+
+    def services(self, date):
+        """(service day start, service_ids running) for date."""
+        day = self._services.get(date)
+        if day is None:
+            if len(self._services) > 8:
+                self._services.clear()
+            day = self._services[date] = (service_day(date), self._active(date))
+        return day
+
+    def _active(self, date):
+        ymd = date.strftime("%Y%m%d")
+        weekday = date.weekday()
+        active = {service for service, (start, end, days) in self.calendar.items()
+                  if start <= ymd <= end and days[weekday]}
+        for service, added in self.exceptions.get(ymd, {}).items():
+            if added:
+                active.add(service)
+            else:
+                active.discard(service)
+        return frozenset(active)
+
+    def next_departures(self, stop_id, now, limit=6):
+        """
+        The first limit departures at stop_id leaving at or after now (epoch
+        s), as Departures with realtime = scheduled.
+        """
+        services = self.stops.get(stop_id)
+        if not services:
+            return []
+
+        found = []
+        today = datetime.date.fromtimestamp(now)
+        # yesterday's service runs past midnight
+        for date in (today - datetime.timedelta(days=1), today, today + datetime.timedelta(days=1)):
+            base, active = self.services(date)
+            for service in active:
+                deps = services.get(service)
+                if deps is None:
+                    continue
+                times, calls = deps
+                i = bisect_left(times, now - base)
+                for j in range(i, min(i + limit, len(times))):
+                    found.append((base + times[j], calls[j], base))
+
+        found.sort()
+        out = []
+        for t, call, base in found[:limit]:
+            trip_id, route, headsign = self.calls[call]
+            out.append(Departure(t, t, route, headsign, "%s:%s@%d" % (self.feed, trip_id, base)))
+        return out
+
+
+def overlay(planned, live, now):
+    """
+    Timetable rows with the realtime estimates of live (Departures or a
+    message from the API) applied by trip; live trips the timetable
+    doesn't know are added. Buses that have left by now are dropped.
+    """
+    live = [d for d in live if isinstance(d, Departure)]
+    by_trip = {d.trip: d for d in live}
+    rows = [by_trip.pop(d.trip, d) for d in planned]
+    rows.extend(by_trip.values())
+    rows = [d for d in rows if d.realtime >= now]
+    rows.sort(key=lambda d: d.realtime)
+    return rows or ["No upcoming departures"]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        sys.exit("usage: python3 -m modules.gtfs hsl.zip index.idx STOP_ID...")
+    t0 = time.perf_counter()
+    tt = Timetable.load_or_build(sys.argv[2], sys.argv[1], sys.argv[3:])
+    print(f"indexed {len(tt.stops)} stops, {len(tt.calls)} calls in {time.perf_counter() - t0:.1f}s")
+    now = time.time()
+    for stop_id in sys.argv[3:]:
+        t0 = time.perf_counter()
+        rows = tt.next_departures(stop_id, now, 6)
+        us = (time.perf_counter() - t0) * 1e6
+        print(f"{stop_id}: {us:.0f} us")
+        for d in rows:
+            print("  ", time.strftime("%H:%M", time.localtime(d.scheduled)), d.route, d.headsign)
@@ -1,78 +1,227 @@
 import requests
 import datetime
+import json
+import logging
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger("hsl")
 
 GRAPHQL_URL = "https://api.digitransit.fi/routing/v2/hsl/gtfs/v1"
 
-def get_stop_times(api_key, stop_id, limit=6):
-    if not api_key:
-        return [("N/A", "N/A", 0, "NoKey", "ERR")]
-    if not stop_id:
-        return [("N/A", "N/A", 0, "NoID", "ERR")]
+# Absolute epoch seconds, so the view can count down (and drop departed
+# buses) on its own between polls. trip identifies the run (trip id and
+# service day), for merging a later refresh into earlier rows.
+Departure = namedtuple("Departure", "scheduled realtime route headsign trip", defaults=(None,))
 
-    query = """
-    {
-      stop(id: "%s") {
+# Horizon queries start this far back, so a bus running late is still in
+# the answer after its scheduled time has passed
+LATE_SLACK_SEC = 600
+
+STOP_FIELDS = """
         name
-        stoptimesWithoutPatterns(numberOfDepartures: %d) {
+        stoptimesWithoutPatterns(startTime: %d, timeRange: %d, numberOfDepartures: %d) {
           scheduledDeparture
           realtimeDeparture
           realtime
           serviceDay
           trip {
+            gtfsId
             routeShortName
             tripHeadsign
           }
         }
-      }
-    }
-    """ % (stop_id, limit)
+"""
+
+
+def _query(api_key, stop_ids, limit, session, start=0, time_range=86400):
+    """
+    One aliased stop() per id (s0, s1, ...) for departures from start
+    (epoch s, 0 = now); returns (data, response bytes).
+    """
+    fields = STOP_FIELDS % (start, time_range, limit)
+    parts = []
+    for i, stop_id in enumerate(stop_ids):
+        if stop_id:
+            parts.append('  s%d: stop(id: %s) {%s  }' % (i, json.dumps(stop_id), fields))
+    query = "{\n%s\n}" % "\n".join(parts)
 
     headers = {
         "Content-Type": "application/json",
         "digitransit-subscription-key": api_key
     }
 
-    try:
-        resp = requests.post(GRAPHQL_URL, json={'query': query}, headers=headers, timeout=10)
-        resp.raise_for_status()
+    resp = (session or requests).post(GRAPHQL_URL, json={'query': query}, headers=headers, timeout=10)
+    resp.raise_for_status()
+    return resp.json().get("data") or {}, len(resp.content)
 
-        data = resp.json()
-        stop = data.get("data", {}).get("stop")
-        if not stop:
-            return [("N/A", "N/A", 0, "NoStop", "ERR")]
 
-        rows = []
-        now = datetime.datetime.now().timestamp()
+def _stop_rows(stop, now, limit):
+    if not stop:
+        return ["HSL ERROR: NoStop"]
 
-        for s in stop.get("stoptimesWithoutPatterns", []):
-            sched = s["serviceDay"] + s["scheduledDeparture"]
-            if sched < now:
-                continue  # skip past
+    rows = []
+    for s in stop.get("stoptimesWithoutPatterns", []):
+        sched = s["serviceDay"] + s["scheduledDeparture"]
+        realdep = s.get("realtimeDeparture", s["scheduledDeparture"]) + s["serviceDay"]
+        if realdep < now:
+            continue  # skip past
 
-            dt = datetime.datetime.fromtimestamp(sched)
-            time_str = dt.strftime("%H:%M")
+        route = s["trip"]["routeShortName"]
+        headsign = s["trip"]["tripHeadsign"].split(",")[0].split("/")[0]
+        trip = "%s@%d" % (s["trip"].get("gtfsId"), s["serviceDay"])
 
-            mins = int((sched - now) / 60)
+        rows.append(Departure(sched, realdep, route, headsign, trip))
 
-            route = s["trip"]["routeShortName"]
-            headsign = s["trip"]["tripHeadsign"].split(",")[0].split("/")[0]
+    if not rows:
+        return ["No upcoming departures"]
 
-            realdep = s.get("realtimeDeparture", s["scheduledDeparture"]) + s["serviceDay"]
-            delay = (realdep - sched) / 60.0
+    return rows[:limit]
 
-            if mins < 5:
-                status = "RUN"
-            elif delay > 1.5:
-                status = "DEL"
-            else:
-                status = "OK"
 
-            rows.append((time_str, route, mins, headsign, status))
+def get_stops_times(api_key, stop_ids, limit=6, session=None):
+    """
+    Departures for any number of stops in one GraphQL request (one aliased
+    stop() per id). Returns, per stop in stop_ids order, a list of
+    Departures or a one-line message.
+    """
+    if not api_key:
+        return [["HSL ERROR: NoKey"] for _ in stop_ids]
+    if not any(stop_ids):
+        return [["HSL ERROR: NoID"] for _ in stop_ids]
 
-        if not rows:
-            return [("-----", "--", 0, "N/A", "NONE")]
+    try:
+        data, _ = _query(api_key, stop_ids, limit, session)
+        now = datetime.datetime.now().timestamp()
 
-        return rows[:limit]
+        out = []
+        for i, stop_id in enumerate(stop_ids):
+            if not stop_id:
+                out.append(["HSL ERROR: NoID"])
+            else:
+                out.append(_stop_rows(data.get("s%d" % i), now, limit))
+        return out
 
     except Exception as e:
-        return [(f"ERR", "----", 0, str(e), "ERR")]
+        return [[f"HSL ERROR: {e}"] for _ in stop_ids]
+
+
+def get_stop_times(api_key, stop_id, limit=6, session=None):
+    """Departures for a single stop."""
+    return get_stops_times(api_key, [stop_id], limit, session)[0]
+
+
+class Horizon:
+    """
+    Departures for the next horizon_sec (up to max_departures per stop),
+    kept between polls so the board can slide along them locally.
+
+    fetch() downloads the whole horizon when the stops change, when the
+    horizon is about to run out, or (at most every near_sec) when a stop
+    has fewer than limit departures left in it. Otherwise it asks just for
+    trips leaving within near_sec, where realtime estimates actually move,
+    and merges those into the cache by trip; if nothing is that close it
+    doesn't ask at all. A failed refresh keeps serving what is cached.
+    """
+
+    def __init__(self, horizon_sec=3600, max_departures=30, near_sec=900):
+        self.horizon_sec = horizon_sec
+        self.max_departures = max_departures
+        self.near_sec = near_sec
+        self._lock = threading.Lock()
+        self._stop_ids = None
+        self._rows = []             # Departures (or an error string) per stop
+        self._covered_until = 0     # epoch s the cached horizon is complete up to
+        self._full_at = 0
+        self.full = 0
+        self.near = 0
+        self.skipped = 0
+        self.failed = 0
+        self.bytes = 0
+
+    def fetch(self, api_key, stop_ids, limit=6, session=None):
+        """
+        Like get_stops_times(), but returns every cached upcoming departure
+        per stop; the caller shows the first limit of them.
+        """
+        if not api_key:
+            return [["HSL ERROR: NoKey"] for _ in stop_ids]
+        if not any(stop_ids):
+            return [["HSL ERROR: NoID"] for _ in stop_ids]
+
+        with self._lock:
+            now = time.time()
+            try:
+                if (stop_ids != self._stop_ids or now >= self._covered_until - self.near_sec
+                        or (now >= self._full_at + self.near_sec and self._running_low(limit, now))):
+                    self._fetch_full(api_key, stop_ids, now, session)
+                elif any(d.realtime < now + self.near_sec
+                         for rows in self._rows if not isinstance(rows, str) for d in rows):
+                    self._fetch_near(api_key, stop_ids, now, session)
+                else:
+                    self.skipped += 1
+            except Exception as e:
+                self.failed += 1
+                if stop_ids != self._stop_ids:
+                    return [[f"HSL ERROR: {e}"] for _ in stop_ids]
+                logger.warning("refresh failed, keeping cached departures: %r", e)
+
+            return [self._upcoming(stop_id, rows, now) for stop_id, rows in zip(stop_ids, self._rows)]
+
+    def _running_low(self, limit, now):
+        return any(not isinstance(rows, str) and sum(d.realtime >= now for d in rows) < limit
+                   for rows in self._rows)
+
+    def _upcoming(self, stop_id, rows, now):
+        if not stop_id:
+            return ["HSL ERROR: NoID"]
+        if isinstance(rows, str):
+            return [rows]
+        upcoming = [d for d in rows if d.realtime >= now]
+        return upcoming or ["No upcoming departures"]
+
+    def _fetch_full(self, api_key, stop_ids, now, session):
+        data, size = _query(api_key, stop_ids, self.max_departures, session,
+                            int(now) - LATE_SLACK_SEC, self.horizon_sec + LATE_SLACK_SEC)
+        self.full += 1
+        self.bytes += size
+
+        out = []
+        covered = now + self.horizon_sec
+        for i, stop_id in enumerate(stop_ids):
+            stop = data.get("s%d" % i)
+            if not stop_id or not stop:
+                out.append("HSL ERROR: NoStop" if stop_id else "HSL ERROR: NoID")
+                continue
+            rows = [r for r in _stop_rows(stop, now, self.max_departures) if isinstance(r, Departure)]
+            if len(rows) >= self.max_departures:
+                # cut short by the count, not the time range
+                covered = min(covered, rows[-1].scheduled)
+            out.append(rows)
+
+        self._stop_ids = list(stop_ids)
+        self._full_at = now
+        self._rows = out
+        self._covered_until = covered
+
+    def _fetch_near(self, api_key, stop_ids, now, session):
+        data, size = _query(api_key, stop_ids, self.max_departures, session,
+                            int(now) - LATE_SLACK_SEC, self.near_sec + LATE_SLACK_SEC)
+        self.near += 1
+        self.bytes += size
+
+        for i, rows in enumerate(self._rows):
+            stop = data.get("s%d" % i)
+            if isinstance(rows, str) or not stop:
+                continue
+            fresh = [r for r in _stop_rows(stop, now, self.max_departures) if isinstance(r, Departure)]
+            trips = {d.trip for d in fresh}
+            horizon_end = now + self.near_sec
+            # keep later trips as they were; near ones are replaced (or gone)
+            kept = [d for d in rows if d.trip not in trips and d.scheduled >= horizon_end]
+            self._rows[i] = sorted(fresh + kept, key=lambda d: d.realtime)
+
+    def stats(self):
+        return {"full": self.full, "near": self.near, "skipped": self.skipped,
+                "failed": self.failed, "bytes": self.bytes}
@@ -0,0 +1,99 @@
+import hashlib
+import threading
+
+import requests
+
+
+class ResponseCache:
+    """
+    Last response per source, so an unchanged feed is neither downloaded
+    nor parsed again.
+
+    Requests carry the ETag / Last-Modified the server sent last time; on
+    304 Not Modified the stored parse result is returned as is. A 200 whose
+    body hashes the same as last time (servers that ignore validators) is
+    not parsed again either. parse(body) should only depend on the bytes;
+    if it stops early based on the clock, fresh(result) tells whether the
+    stored result still covers now, and if not the stored body is parsed
+    again without downloading it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}      # source -> (url, etag, last_modified, digest, body, parsed)
+        self._stats = {}
+
+    def _count(self, source, key, n=1):
+        st = self._stats.setdefault(source, {
+            "requests": 0, "not_modified": 0, "unchanged": 0, "parsed": 0, "reparsed": 0,
+            "bytes_saved": 0})
+        st[key] += n
+
+    def _reuse(self, source, entry, parse, fresh):
+        if fresh is None or fresh(entry[5]):
+            return entry[5]
+        parsed = parse(entry[4])
+        with self._lock:
+            self._count(source, "reparsed")
+            self._entries[source] = entry[:5] + (parsed,)
+        return parsed
+
+    def get(self, session, url, parse, source, headers=None, fresh=None, **kwargs):
+        with self._lock:
+            entry = self._entries.get(source)
+        if entry is not None and entry[0] != url:
+            entry = None
+
+        headers = dict(headers or {})
+        if entry is not None:
+            if entry[1]:
+                headers["If-None-Match"] = entry[1]
+            if entry[2]:
+                headers["If-Modified-Since"] = entry[2]
+
+        r = (session or requests).get(url, headers=headers, **kwargs)
+        not_modified = r.status_code == 304 and entry is not None
+        with self._lock:
+            self._count(source, "requests")
+            if not_modified:
+                self._count(source, "not_modified")
+                self._count(source, "bytes_saved", len(entry[4]))
+        if not_modified:
+            return self._reuse(source, entry, parse, fresh)
+        r.raise_for_status()
+
+        body = r.content
+        digest = hashlib.sha1(body).digest()
+        validators = (url, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+        if entry is not None and entry[3] == digest:
+            with self._lock:
+                self._count(source, "unchanged")
+                self._entries[source] = validators + entry[3:]
+            return self._reuse(source, self._entries[source], parse, fresh)
+
+        parsed = parse(body)
+        with self._lock:
+            self._count(source, "parsed")
+            self._entries[source] = validators + (digest, body, parsed)
+        return parsed
+
+    def stats(self):
+        """Per source: requests, 304s, unchanged bodies, (re)parses, bytes not downloaded."""
+        with self._lock:
+            out = {source: dict(st) for source, st in self._stats.items()}
+        for st in out.values():
+            st["hit_rate"] = (st["not_modified"] + st["unchanged"]) / st["requests"] if st["requests"] else 0.0
+        return out
+
+
+def get_parsed(session, url, parse, source, fresh=None, **kwargs):
+    """
+    parse(body) of url, through session's ResponseCache when it has one;
+    session may also be the requests module (or None) for a plain GET.
+    """
+    cache = getattr(session, "cache", None)
+    if cache is not None:
+        return cache.get(session, url, parse, source, fresh=fresh, **kwargs)
+    r = (session or requests).get(url, **kwargs)
+    r.raise_for_status()
+    return parse(r.content)
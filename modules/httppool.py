@@ -0,0 +1,94 @@
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class Sessions:
+    """
+    Keep-alive HTTP sessions shared by every fetcher, one per host.
+
+    Each host gets its own requests.Session with a pool of up to pool_size
+    kept-alive connections, so a poll every 20 s reuses the TCP+TLS
+    connection instead of handshaking again. get()/post() take the same
+    arguments as requests.get()/post(), so a fetcher can be handed either
+    this or the requests module itself.
+
+    timeout, if set, overrides the fetchers' own defaults; host_timeouts
+    overrides it per host (e.g. {"api.digitransit.fi": 5}), and
+    with_timeout() per caller. cache, a ResponseCache, is what
+    httpcache.get_parsed() uses for fetchers given these sessions.
+    """
+
+    def __init__(self, pool_size=2, timeout=None, host_timeouts=None, cache=None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.host_timeouts = host_timeouts or {}
+        self.cache = cache
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.requests = {}
+
+    def session(self, host):
+        with self._lock:
+            s = self._sessions.get(host)
+            if s is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                self._sessions[host] = s
+            self.requests[host] = self.requests.get(host, 0) + 1
+            return s
+
+    def request(self, method, url, timeout_override=None, **kwargs):
+        host = urlsplit(url).hostname or ""
+        if timeout_override is not None:
+            kwargs["timeout"] = timeout_override
+        elif host in self.host_timeouts:
+            kwargs["timeout"] = self.host_timeouts[host]
+        elif self.timeout is not None:
+            kwargs["timeout"] = self.timeout
+        return self.session(host).request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def with_timeout(self, timeout):
+        """The same pools, with every request made through it using timeout."""
+        return _TimedSessions(self, timeout)
+
+    def stats(self):
+        """Per host: requests sent and TCP connections opened for them."""
+        out = {}
+        with self._lock:
+            sessions = list(self._sessions.items())
+        for host, s in sessions:
+            opened = 0
+            for adapter in set(s.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in list(pools.keys()):
+                    pool = pools.get(key)
+                    if pool is not None:
+                        opened += pool.num_connections
+            sent = self.requests.get(host, 0)
+            out[host] = {"requests": sent, "connections": opened,
+                         "reused": max(0, sent - opened)}
+        return out
+
+
+class _TimedSessions:
+    def __init__(self, sessions, timeout):
+        self.sessions = sessions
+        self.timeout = timeout
+        self.cache = sessions.cache
+
+    def get(self, url, **kwargs):
+        return self.sessions.request("GET", url, timeout_override=self.timeout, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.sessions.request("POST", url, timeout_override=self.timeout, **kwargs)
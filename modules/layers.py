@@ -0,0 +1,54 @@
+import pygame
+
+
+def new_surface(size, like=None):
+    """
+    Opaque offscreen surface in the same format as like (the surface it
+    will be blitted onto), or the display's format when like is None.
+    Matching formats keep every blit a plain copy.
+    """
+    if like is not None:
+        surf = pygame.Surface(size, 0, like)
+        if like.get_bitsize() == 8:
+            # pygame copies the depth but not the palette
+            surf.set_palette(like.get_palette())
+        return surf
+    surf = pygame.Surface(size)
+    if pygame.display.get_surface() is not None:
+        surf = surf.convert()
+    return surf
+
+
+class CachedLayer:
+    """
+    Full-screen offscreen surface that is only redrawn when its key changes.
+
+    Used for a view's static chrome (keyed by view + config) and for the
+    whole rendered view body (keyed by the state versions it read), so a
+    typical frame is a single blit of this surface instead of a fill plus
+    dozens of text renders. One surface is reused for every key to keep
+    memory flat on the Pi.
+
+    like: surface whose format (8-bit palette or display) the layer uses.
+    """
+
+    def __init__(self, size, background=(0, 0, 0), like=None):
+        self.background = background
+        self.surface = new_surface(size, like)
+        self.key = None
+        self.builds = 0
+        self.hits = 0
+
+    def get(self, key, build):
+        """Return the layer for key, calling build(surface) if it is stale."""
+        if key != self.key:
+            self.surface.fill(self.background)
+            build(self.surface)
+            self.key = key
+            self.builds += 1
+        else:
+            self.hits += 1
+        return self.surface
+
+    def invalidate(self):
+        self.key = None
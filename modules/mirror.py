@@ -0,0 +1,271 @@
+import base64
+import io
+import json
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pygame
+
+from modules.perf import Rolling
+
+
+def encode_png(width, height, rgb, level=3):
+    """Minimal truecolor PNG; zlib does the work (and drops the GIL doing it)."""
+    stride = width * 3
+    raw = b"".join(b"\x00" + rgb[y * stride:(y + 1) * stride] for y in range(height))
+
+    def chunk(tag, data):
+        return (struct.pack(">I", len(data)) + tag + data
+                + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, level))
+            + chunk(b"IEND", b""))
+
+
+PAGE = """<!doctype html>
+<html><head><title>WOPR mirror</title>
+<style>body{background:#000;margin:0}canvas{display:block;margin:auto;max-width:100%%}</style>
+</head><body><canvas id="c" width="%d" height="%d"></canvas>
+<script>
+// polls /tiles and paints only the tiles that changed since the last poll
+var ctx = document.getElementById("c").getContext("2d"), seq = 0;
+function poll() {
+  fetch("/tiles?since=" + seq).then(r => r.json()).then(d => {
+    seq = d.seq;
+    d.tiles.forEach(t => { var i = new Image(); i.onload = () => ctx.drawImage(i, t[0], t[1]); i.src = t[2]; });
+  }).catch(() => {}).finally(() => setTimeout(poll, %d));
+}
+poll();
+</script></body></html>
+"""
+
+
+class Mirror:
+    """
+    Serves what is on the panel over HTTP, for watching from a desk.
+
+      /              page that repaints changed tiles (polls /tiles)
+      /tiles?since=N JSON of the PNG tiles that changed after sequence N
+      /frame         the current frame (JPEG if pygame can, else PNG)
+      /stream.mjpg   multipart stream of /frame, a part per change
+
+    The main loop calls capture() after each present() with the rects it
+    pushed; that only copies them into a shadow surface. Encoding happens
+    on a background thread: tiles under those rects are checksummed and
+    re-encoded only if their pixels really changed, and the thread sleeps
+    so that encoding stays under max_fps and cpu_share of one core.
+    """
+
+    def __init__(self, size, port, host="0.0.0.0", tile=80, max_fps=5, cpu_share=0.25):
+        self.size = size
+        self.port = port
+        self.host = host
+        self.tile = tile
+        self.max_fps = max_fps
+        self.cpu_share = cpu_share
+
+        self._shadow = pygame.Surface(size)
+        if pygame.display.get_surface() is not None:
+            self._shadow = self._shadow.convert()
+        self._cond = threading.Condition()
+        self._pending = []        # rects captured since the last encode
+        self._tiles = {}          # (x, y) -> (crc, seq, png)
+        self._full = (-1, b"", "image/png")
+        self._full_wanted = False
+        self._streams = 0
+        self.seq = 0
+
+        self.jpeg = pygame.image.get_extended()
+        self.encode_ms = Rolling(100)
+        self.captures = 0
+        self.tiles_encoded = 0
+        self.tiles_unchanged = 0
+
+    # -- main thread --
+
+    def capture(self, surface, rects):
+        """Copy what was just presented (rects, or everything if None)."""
+        full = pygame.Rect((0, 0), self.size)
+        with self._cond:
+            if rects is None:
+                rects = [full]
+            else:
+                rects = [full.clip(r) for r in rects]
+                rects = [r for r in rects if r.width and r.height]
+                if not rects:
+                    return
+            for r in rects:
+                self._shadow.blit(surface, r, r)
+            self._pending.extend(rects)
+            self.captures += 1
+            self._cond.notify_all()
+
+    def start(self):
+        threading.Thread(target=self._encode_loop, daemon=True).start()
+        server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # -- encoder thread --
+
+    def _tile_rects(self, rects):
+        t = self.tile
+        width, height = self.size
+        seen = set()
+        for r in rects:
+            for ty in range(r.top // t * t, r.bottom, t):
+                for tx in range(r.left // t * t, r.right, t):
+                    if (tx, ty) not in seen:
+                        seen.add((tx, ty))
+                        yield pygame.Rect(tx, ty, min(t, width - tx), min(t, height - ty))
+
+    def _encode_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not (self._full_wanted and self._full[0] != self.seq):
+                    self._cond.wait()
+                rects, self._pending = self._pending, []
+
+            t0 = time.perf_counter()
+            changed = []
+            for rect in self._tile_rects(rects):
+                with self._cond:
+                    rgb = pygame.image.tobytes(self._shadow.subsurface(rect), "RGB")
+                crc = zlib.crc32(rgb)
+                old = self._tiles.get(rect.topleft)
+                if old is not None and old[0] == crc:
+                    self.tiles_unchanged += 1
+                    continue
+                changed.append((rect.topleft, crc, encode_png(rect.width, rect.height, rgb)))
+
+            with self._cond:
+                if changed:
+                    self.seq += 1
+                    for pos, crc, png in changed:
+                        self._tiles[pos] = (crc, self.seq, png)
+                    self.tiles_encoded += len(changed)
+                want_full = (self._streams or self._full_wanted) and self._full[0] != self.seq
+                if want_full:
+                    shot = self._shadow.copy()
+                    seq = self.seq
+
+            if want_full:
+                full = self._encode_full(shot)
+                with self._cond:
+                    self._full = (seq,) + full
+                    self._full_wanted = False
+            with self._cond:
+                self._cond.notify_all()
+
+            # rate cap: at most max_fps encodes, and busy at most cpu_share of the time
+            busy = time.perf_counter() - t0
+            self.encode_ms.add(busy * 1000.0)
+            period = max(1.0 / self.max_fps, busy / self.cpu_share)
+            time.sleep(max(0.0, period - busy))
+
+    def _encode_full(self, shot):
+        if self.jpeg:
+            buf = io.BytesIO()
+            pygame.image.save(shot, buf, "frame.jpg")
+            return buf.getvalue(), "image/jpeg"
+        width, height = self.size
+        return encode_png(width, height, pygame.image.tobytes(shot, "RGB")), "image/png"
+
+    # -- HTTP threads --
+
+    def tiles_since(self, since):
+        with self._cond:
+            tiles = [(x, y, png) for (x, y), (_, seq, png) in self._tiles.items() if seq > since]
+            seq = self.seq
+        return {
+            "seq": seq,
+            "tiles": [[x, y, "data:image/png;base64," + base64.b64encode(png).decode("ascii")]
+                      for x, y, png in tiles],
+        }
+
+    def frame(self, newer_than=-1, timeout=2.0):
+        """Wait (up to timeout) for a full frame newer than newer_than."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._full[0] <= newer_than or self._full[0] != self.seq:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                self._full_wanted = True
+                self._cond.notify_all()
+                self._cond.wait(left)
+            return self._full
+
+    def stats(self):
+        return {
+            "seq": self.seq,
+            "captures": self.captures,
+            "tiles_encoded": self.tiles_encoded,
+            "tiles_unchanged": self.tiles_unchanged,
+            "streams": self._streams,
+            "encode_p50_ms": self.encode_ms.percentile(50),
+        }
+
+    def _handler(self):
+        mirror = self
+        width, height = self.size
+        poll_ms = int(1000 / self.max_fps)
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, ctype, body):
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/":
+                    self._send("text/html", (PAGE % (width, height, poll_ms)).encode())
+                elif url.path == "/tiles":
+                    since = int(parse_qs(url.query).get("since", ["0"])[0])
+                    self._send("application/json", json.dumps(mirror.tiles_since(since)).encode())
+                elif url.path == "/frame":
+                    _, body, ctype = mirror.frame()
+                    self._send(ctype, body)
+                elif url.path == "/stream.mjpg":
+                    self._stream()
+                else:
+                    self.send_error(404)
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                with mirror._cond:
+                    mirror._streams += 1
+                    mirror._cond.notify_all()
+                last = -1
+                try:
+                    while True:
+                        seq, body, ctype = mirror.frame(last, timeout=30.0)
+                        if seq == last:
+                            continue
+                        last = seq
+                        self.wfile.write(b"--frame\r\nContent-Type: " + ctype.encode()
+                                         + b"\r\nContent-Length: " + str(len(body)).encode()
+                                         + b"\r\n\r\n" + body + b"\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with mirror._cond:
+                        mirror._streams -= 1
+
+        return Handler
@@ -0,0 +1,19 @@
+def build_palette(colors, levels=42):
+    """
+    256-entry palette for the 8-bit canvas: black at index 0, then `levels`
+    brightness steps from dark to full for each UI color, so antialiased text
+    edges still have a close match. 6 colors x 42 steps fits in 255 slots.
+    """
+    if 1 + len(colors) * levels > 256:
+        raise ValueError("too many colors/levels for an 8-bit palette")
+    palette = [(0, 0, 0)]
+    for color in colors:
+        for level in range(1, levels + 1):
+            palette.append(tuple(c * level // levels for c in color))
+    palette += [(0, 0, 0)] * (256 - len(palette))
+    return palette
+
+
+def dimmed(palette, factor):
+    """The same palette scaled towards black (factor 1.0 = unchanged)."""
+    return [tuple(int(c * factor) for c in rgb) for rgb in palette]
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import deque
+
+
+class Rolling:
+    """Last N samples (ms) with cheap percentiles for the HUD."""
+
+    def __init__(self, size=300):
+        self.samples = deque(maxlen=size)
+
+    def add(self, ms):
+        self.samples.append(ms)
+
+    @property
+    def last(self):
+        return self.samples[-1] if self.samples else 0.0
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        s = sorted(self.samples)
+        return s[min(len(s) - 1, int(pct / 100.0 * len(s)))]
+
+
+class TimedLock:
+    """
+    threading.Lock that adds up how long the owning (main) thread waited
+    for it, so lock contention shows up as its own frame phase.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._owner = threading.get_ident()
+        self.waited_ms = 0.0
+
+    def __enter__(self):
+        if threading.get_ident() != self._owner:
+            self._lock.acquire()
+            return self
+        t0 = time.perf_counter()
+        self._lock.acquire()
+        self.waited_ms += (time.perf_counter() - t0) * 1000.0
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+    def take_waited(self):
+        ms, self.waited_ms = self.waited_ms, 0.0
+        return ms
+
+
+class FrameTimer:
+    """
+    Per-phase timers for the main loop.
+
+    start() at the top of a frame, lap(name) after each phase (time since
+    the previous lap), end() once the frame is on screen. Every phase and
+    the whole frame feed rolling histograms; fetch latencies from the
+    updater thread and touch-to-redraw latencies are kept alongside.
+    """
+
+    def __init__(self, phases, size=300):
+        self.phases = {name: Rolling(size) for name in phases}
+        self.frame = Rolling(size)
+        self.touch = Rolling(100)
+        self.fetch = {}
+        self._frame_starts = deque(maxlen=30)
+        self._t0 = self._lap = time.perf_counter()
+
+    def start(self):
+        self._t0 = self._lap = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.phases[name].add((now - self._lap) * 1000.0)
+        self._lap = now
+
+    def add(self, name, ms):
+        """Record a phase measured elsewhere (e.g. lock waits)."""
+        self.phases[name].add(ms)
+
+    def end(self):
+        now = time.perf_counter()
+        self.frame.add((now - self._t0) * 1000.0)
+        self._frame_starts.append(self._t0)
+
+    def fps(self):
+        starts = self._frame_starts
+        if len(starts) < 2:
+            return 0.0
+        span = time.perf_counter() - starts[0]
+        return (len(starts) - 1) / span if span > 0 else 0.0
+
+    def record_touch(self, t0):
+        """Input seen at perf_counter() t0 is now on screen."""
+        self.touch.add((time.perf_counter() - t0) * 1000.0)
+
+    def record_fetch(self, source, ms):
+        """Called from the updater thread after each fetch."""
+        self.fetch[source] = ms
@@ -0,0 +1,75 @@
+class Scroller:
+    """
+    Scroll position of a board that can be longer than its viewport.
+
+    mode "scroll": hold at the top for hold_ms, glide down at speed px/s
+    until the last row is in view, hold again, jump back to the top.
+    mode "page": a viewport-full of rows at a time, flipping every hold_ms.
+    mode "off": always the first rows.
+
+    The position is a pure function of the tick and the row count, so
+    drawing a frame and predicting the next change are both O(1) however
+    long the list is.
+    """
+
+    def __init__(self, row_height, viewport_rows, mode="scroll", speed=26, hold_ms=4000):
+        self.row_height = row_height
+        self.viewport_rows = viewport_rows
+        self.mode = mode
+        self.speed = max(1, speed)
+        self.hold_ms = max(1, hold_ms)
+        self.start_ms = 0
+
+    def restart(self, now_ms):
+        """Back to the top, e.g. when the board comes into view."""
+        self.start_ms = now_ms
+
+    def _travel(self, n_rows):
+        return max(0, n_rows - self.viewport_rows) * self.row_height
+
+    def _scroll_cycle(self, travel):
+        glide_ms = travel * 1000 // self.speed
+        return glide_ms, 2 * self.hold_ms + glide_ms
+
+    def _pages(self, n_rows):
+        return -(-n_rows // self.viewport_rows)
+
+    def offset(self, n_rows, now_ms):
+        """Pixels the board is scrolled down at now_ms."""
+        travel = self._travel(n_rows)
+        if travel == 0 or self.mode == "off":
+            return 0
+
+        elapsed = now_ms - self.start_ms
+        if self.mode == "page":
+            page = (elapsed // self.hold_ms) % self._pages(n_rows)
+            return page * self.viewport_rows * self.row_height
+
+        glide_ms, cycle = self._scroll_cycle(travel)
+        t = elapsed % cycle - self.hold_ms
+        if t <= 0:
+            return 0
+        if t >= glide_ms:
+            return travel
+        return t * self.speed // 1000
+
+    def next_change(self, n_rows, now_ms):
+        """Tick at which offset() next changes, None if it never will."""
+        travel = self._travel(n_rows)
+        if travel == 0 or self.mode == "off":
+            return None
+
+        elapsed = now_ms - self.start_ms
+        if self.mode == "page":
+            return self.start_ms + (elapsed // self.hold_ms + 1) * self.hold_ms
+
+        glide_ms, cycle = self._scroll_cycle(travel)
+        cycle_start = self.start_ms + elapsed // cycle * cycle
+        t = elapsed % cycle - self.hold_ms
+        if t < 0:
+            return cycle_start + self.hold_ms
+        if t >= glide_ms:
+            return cycle_start + cycle
+        # the next whole pixel
+        px = t * self.speed // 1000 + 1
+        return cycle_start + self.hold_ms + -(-px * 1000 // self.speed)
@@ -0,0 +1,66 @@
+from collections import OrderedDict
+
+from modules.layers import new_surface
+
+
+class Table:
+    """
+    A board with fixed columns (HSL stops, departures, arrivals).
+
+    columns is a list of (header, x). A row is given as one (text, color)
+    per column; it is composed once into a single surface keyed by exactly
+    that, so drawing it again is one blit instead of one per cell.
+    Row surfaces are made in the format of like (see new_surface).
+    """
+
+    def __init__(self, columns, font, text_cache, max_rows=64, like=None):
+        self.columns = columns
+        self.font = font
+        self.text_cache = text_cache
+        self.like = like
+        self.height = font.get_linesize()
+        self.max_rows = max_rows
+        self._rows = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def row_surface(self, cells):
+        """Surface for one row; cells is a tuple of (text, color) per column."""
+        key = tuple(cells)
+        surf = self._rows.get(key)
+        if surf is not None:
+            self._rows.move_to_end(key)
+            self.hits += 1
+            return surf
+
+        self.misses += 1
+        x0 = self.columns[0][1]
+        parts = []
+        width = 0
+        for (text, color), (_, x) in zip(key, self.columns):
+            text = str(text)
+            if not text:
+                continue
+            part = self.text_cache.render(self.font, text, color)
+            parts.append((part, x - x0))
+            width = max(width, x - x0 + part.get_width())
+
+        surf = new_surface((max(width, 1), self.height), self.like)
+        surf.fill((0, 0, 0))
+        for part, x in parts:
+            surf.blit(part, (x, 0))
+
+        self._rows[key] = surf
+        if len(self._rows) > self.max_rows:
+            self._rows.popitem(last=False)
+        return surf
+
+    def clear(self):
+        self._rows.clear()
+
+    def draw_row(self, target, cells, y):
+        """Blit a row at y; returns the rect it covered."""
+        return target.blit(self.row_surface(cells), (self.columns[0][1], y))
+
+    def draw_headers(self, target, y, color):
+        return self.draw_row(target, [(header, color) for header, _ in self.columns], y)
@@ -0,0 +1,70 @@
+from collections import OrderedDict
+
+
+class TextCache:
+    """
+    LRU cache of rendered text surfaces.
+
+    Keyed by (text, font, color). The bound is the total pixel memory of the
+    cached surfaces rather than an entry count, so a handful of long lines
+    can't crowd out hundreds of short table cells.
+
+    With like (an 8-bit palettized canvas) text is rendered shaded on black
+    and converted to that palette once, so drawing it is a byte copy and
+    each cached surface takes a quarter of the memory.
+    """
+
+    def __init__(self, max_bytes=4 * 1024 * 1024, antialias=True, like=None):
+        self.max_bytes = max_bytes
+        self.antialias = antialias
+        self.like = like
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, fnt, text, color):
+        """Return a surface for text, rendering it only on a cache miss."""
+        key = (text, fnt, color)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        if self.like is not None:
+            surf = fnt.render(text, self.antialias, color, (0, 0, 0)).convert(self.like)
+        else:
+            surf = fnt.render(text, self.antialias, color)
+        size = surf.get_pitch() * surf.get_height()
+
+        # Never cache something that would flush the whole cache by itself
+        if size > self.max_bytes:
+            return surf
+
+        self._entries[key] = (surf, size)
+        self.bytes += size
+
+        while self.bytes > self.max_bytes:
+            _, (_, old_size) = self._entries.popitem(last=False)
+            self.bytes -= old_size
+            self.evictions += 1
+
+        return surf
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
@@ -0,0 +1,56 @@
+class Timeline:
+    """
+    A scripted text animation driven by the frame clock instead of sleeps.
+
+    Steps are played in order:
+      ("text", text, x, y, font)           shown at once
+      ("type", text, x, y, font, char_ms)  typewriter, one char per char_ms
+      ("pause", ms)                        nothing new for ms
+
+    draw() renders everything visible at a given tick, so the main loop can
+    keep handling input and draw one step per frame.
+    """
+
+    def __init__(self, steps, start_ms):
+        self.start_ms = start_ms
+        self.chars = []  # (appear_at_ms, ch, x, y, font), relative to start
+        t = 0
+        for step in steps:
+            kind = step[0]
+            if kind == "pause":
+                t += step[1]
+                continue
+
+            text, x, y, fnt = step[1:5]
+            char_ms = step[5] if kind == "type" else 0
+            for ch in text:
+                self.chars.append((t, ch, x, y, fnt))
+                x += fnt.size(ch)[0]
+                t += char_ms
+
+        self.typed_ms = t if not self.chars else self.chars[-1][0]
+        self.duration_ms = t
+
+    def draw(self, now_ms, draw_text):
+        elapsed = now_ms - self.start_ms
+        for at, ch, x, y, fnt in self.chars:
+            if at > elapsed:
+                break
+            draw_text(ch, x, y, fnt)
+
+    def next_change(self, now_ms):
+        """Tick of the next visible change (or the end), None when finished."""
+        elapsed = now_ms - self.start_ms
+        for at, *_ in self.chars:
+            if at > elapsed:
+                return self.start_ms + at
+        if elapsed < self.duration_ms:
+            return self.start_ms + self.duration_ms
+        return None
+
+    def typed(self, now_ms):
+        """True once every character is on screen (only pauses remain)."""
+        return now_ms - self.start_ms >= self.typed_ms
+
+    def done(self, now_ms):
+        return now_ms - self.start_ms >= self.duration_ms
@@ -8,7 +8,7 @@ def to_local_dt(ts):
     return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).astimezone()
 
 
-def get_weather(api_key, city="Vantaa"):
+def get_weather(api_key, city="Vantaa", session=None):
     if not api_key:
         return {
             "temp": "N/A",
@@ -32,7 +32,7 @@ def get_weather(api_key, city="Vantaa"):
             "https://api.openweathermap.org/data/2.5/weather"
             f"?q={city}&units=metric&appid={api_key}"
         )
-        r = requests.get(url, timeout=8)
+        r = (session or requests).get(url, timeout=8)
         r.raise_for_status()
         data = r.json()
 
@@ -0,0 +1,33 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.fetchsched import FetchScheduler
+
+
+def wait_for(cond, timeout=2.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_skipped_source_runs_once_allowed():
+    # e.g. weather while the backlight is off, then a screen_on_windows wake
+    screen_on = [False]
+    ran = threading.Event()
+    sched = FetchScheduler(ThreadPoolExecutor(max_workers=1), jitter=0, recheck=0.05)
+    sched.add("weather", ran.set, lambda: 300, when=lambda: screen_on[0])
+    threading.Thread(target=sched.run, daemon=True).start()
+
+    time.sleep(0.2)
+    assert not ran.is_set()
+    # still due, not pushed back a whole interval
+    assert dict(sched.queue())["weather"] < 1
+
+    screen_on[0] = True
+    assert ran.wait(1.0)
+    # then back to the normal interval
+    assert wait_for(lambda: (dict(sched.queue())["weather"] or 0) > 200)
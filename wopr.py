@@ -1,8 +1,9 @@
 import os
 
-os.environ["SDL_VIDEODRIVER"] = "kmsdrm"
-os.environ["SDL_RENDER_DRIVER"] = "software"
-os.environ["SDL_AUDIODRIVER"] = "dummy"
+# setdefault so e.g. SDL_VIDEODRIVER=dummy can run the UI headless (bench/)
+os.environ.setdefault("SDL_VIDEODRIVER", "kmsdrm")
+os.environ.setdefault("SDL_RENDER_DRIVER", "software")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
 
 os.environ["SDL_MOUSEDRV"] = "TSLIB"
 os.environ["SDL_MOUSEDEV"] = "/dev/input/event2"
@@ -16,17 +17,40 @@ import time
 import json
 import threading
 import datetime
+import logging
 
 from modules.weather import get_weather, to_local_dt
-from modules.hsl import get_stop_times
-from modules.flights import get_flights, get_arrivals
+from modules.hsl import Horizon, Departure, LATE_SLACK_SEC
+from modules.gtfs import Timetable, overlay
+from modules.flights import get_flights, get_arrivals, Flight
 from modules.fmi import get_pedestrian_warning
 from modules.electricity import get_spot_prices
+from modules.textcache import TextCache
+from modules.dirty import DirtyTracker
+from modules.effects import CRTEffects
+from modules.layers import CachedLayer
+from modules.palette import build_palette
+from modules.framesched import FrameScheduler, next_phase
+from modules.timeline import Timeline
+from modules.perf import FrameTimer, TimedLock
+from modules.table import Table
+from modules.scroller import Scroller
+from modules.mirror import Mirror
+from modules.httppool import Sessions
+from modules.httpcache import ResponseCache
+from modules.fetchsched import FetchScheduler
+from modules.gestures import (
+    GestureRecognizer, DOUBLE_TAP, SWIPE_LEFT, SWIPE_RIGHT, LONG_PRESS,
+)
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 
 # load config
 HERE = os.path.dirname(os.path.abspath(__file__))
-with open(os.path.join(HERE, "config.json")) as f:
+CONFIG_PATH = os.environ.get("WOPR_CONFIG", os.path.join(HERE, "config.json"))
+with open(CONFIG_PATH) as f:
     cfg = json.load(f)
 
 VIEW_HSL = 0
@@ -53,6 +77,7 @@ else:
     base_font = pygame.font.SysFont("DejaVu Sans Mono", 18)
 
 big_font = pygame.font.Font(font_path, 22) if os.path.exists(font_path) else pygame.font.SysFont("DejaVu Sans Mono", 22)
+hud_font = pygame.font.Font(font_path, 14) if os.path.exists(font_path) else pygame.font.SysFont("DejaVu Sans Mono", 14)
 
 GREEN = (0, 255, 0)
 BLACK = (0, 0, 0)
@@ -60,6 +85,53 @@ DIM_GREEN = (0, 80, 0)
 YELLOW = (255, 215, 0)
 RED = (255, 80, 80)
 WHITE = (255, 255, 255)
+DARK_RED = (120, 0, 0)
+
+# where frames are composed: the display itself, or with palette_mode an
+# 8-bit offscreen canvas (every color above, in brightness steps) that is
+# converted to the display format once, in present()
+PALETTE_MODE = cfg.get("palette_mode", False)
+if PALETTE_MODE:
+    PALETTE = build_palette([GREEN, DIM_GREEN, YELLOW, RED, WHITE, DARK_RED])
+    frame = pygame.Surface((WIDTH, HEIGHT), 0, 8)
+    frame.set_palette(PALETTE)
+else:
+    PALETTE = None
+    frame = screen
+like = frame if PALETTE_MODE else None
+
+# rendered text surfaces, shared by every view and the top line
+text_cache = TextCache(int(cfg.get("text_cache_mb", 4) * 1024 * 1024), like=like)
+# the clock is a new string every second and would push the view text out
+# of text_cache, so it gets a couple of slots of its own
+clock_cache = TextCache(64 * 1024, like=like)
+
+# what changed on screen since the previous frame
+dirty = DirtyTracker((WIDTH, HEIGHT))
+
+# scanline / flicker layers, baked once
+effects = CRTEffects((WIDTH, HEIGHT), DIM_GREEN, like=like, palette=PALETTE)
+
+# static per-view background (title, headers), rebuilt only when it changes
+chrome = CachedLayer((WIDTH, HEIGHT), BLACK, like=like)
+
+# whole rendered view (chrome + top line + data), rebuilt when its inputs change
+body = CachedLayer((WIDTH, HEIGHT), BLACK, like=like)
+
+# frame pacing: sleep until something on screen is due to change
+frame_sched = FrameScheduler(min_frame_ms=int(1000 / cfg.get("max_fps", 10)))
+
+# optional HTTP mirror of the panel, off unless mirror_port is set
+mirror = None
+if cfg.get("mirror_port"):
+    mirror = Mirror(
+        (WIDTH, HEIGHT), cfg["mirror_port"],
+        max_fps=cfg.get("mirror_max_fps", 5),
+        cpu_share=cfg.get("mirror_cpu_share", 0.25),
+    )
+
+# posted by the updater thread so new data is drawn without waiting
+DATA_EVENT = pygame.event.custom_type()
 
 
 # -------- BACKLIGHT / TIME WINDOW HELPERS --------
@@ -67,121 +139,236 @@ WHITE = (255, 255, 255)
 BACKLIGHT_TIMEOUT = cfg.get("backlight_timeout_min", 20) * 60 * 1000
 backlight_on = True
 last_temps = deque(maxlen=12)
-in_greeting = False
 
 
+# HSL stops shown, as (stop id, description): "hsl_stops" is a list of
+# {"id": ..., "desc": ...}; older configs name exactly two stops
+def load_hsl_stops():
+    stops = cfg.get("hsl_stops")
+    if stops:
+        return [(stop["id"], stop.get("desc", stop["id"])) for stop in stops]
+    return [
+        (cfg.get("hsl_stop_1"), cfg.get("hsl_stop_1_desc", "")),
+        (cfg.get("hsl_stop_2"), cfg.get("hsl_stop_2_desc", "")),
+    ]
+
+HSL_STOPS = load_hsl_stops()
+
 # state
 state = {
     "weather": {"temp": "N/A", "desc": "", "trend": "", "wind_speed": "", "wind_dir": None},
     "ped_warning": None,
-    "buses_stop_1": ["Loading..."],
-    "buses_stop_2": ["Loading..."],
+    "buses": [["Loading..."] for _ in HSL_STOPS],  # rows per HSL_STOPS entry
     "flights": ["Loading..."],
     "arrivals": ["Loading..."],
     "electricity": None
 }
 
-lock = threading.Lock()
-
-def updater_loop():
-    global backlight_on, force_refresh, initial_refresh
-
-    weather_interval = cfg.get("weather_interval_sec", 300)      # default 5 min
-    hsl_interval = cfg.get("hsl_interval_sec", 20)               # screen ON
-    hsl_interval_off = cfg.get("hsl_interval_off_sec", 40)       # screen OFF
-    flight_interval = cfg.get("flight_interval_sec", 60)         # default 1 min
-    energy_interval = cfg.get("energy_interval_sec", 600)  # default every 10 minutes
-  
-    last_weather = 0.0
-    last_hsl = 0.0
-    last_flights = 0.0
-    last_energy = 0.0
+# bumped on every write, so cached renders know when their inputs changed
+state_version = {key: 0 for key in state}
+
+# a plain lock that also tallies how long the main thread waits on it
+lock = TimedLock()
+
+# per-phase frame timings and fetch latencies, shown by the perf HUD
+perf = FrameTimer(("events", "backlight", "lock", "draw", "effects", "flip"))
+show_hud = cfg.get("perf_hud", False)
+
+# keep-alive connections shared by every fetcher, one pool per host; the
+# XML/JSON feeds are only downloaded and parsed again when they change
+http = Sessions(
+    pool_size=cfg.get("http_pool_size", 2),
+    timeout=cfg.get("http_timeout_sec"),
+    host_timeouts=cfg.get("http_host_timeouts"),
+    cache=ResponseCache() if cfg.get("http_cache", True) else None,
+)
+
+# per-source request timeouts (s), so e.g. buses give up long before flights
+FETCH_TIMEOUTS = {"hsl": 6}
+FETCH_TIMEOUTS.update(cfg.get("fetch_timeout_sec", {}))
+
+def timed_fetch(source, fetch, *args):
+    """Run a fetcher on the shared sessions, recording its latency for the perf HUD."""
+    session = http
+    if source in FETCH_TIMEOUTS:
+        session = http.with_timeout(FETCH_TIMEOUTS[source])
+    t0 = time.perf_counter()
+    try:
+        return fetch(*args, session=session)
+    finally:
+        perf.record_fetch(source, (time.perf_counter() - t0) * 1000.0)
 
-    while True:
+def publish(**values):
+    """Store fetched data in state and bump each written key's version."""
+    with lock:
+        for key, value in values.items():
+            state[key] = value
+            state_version[key] += 1
+    # nothing to redraw while the screen is dark; don't wake the main loop
+    if backlight_on:
+        pygame.event.post(pygame.event.Event(DATA_EVENT))
+
+# -------- FETCH JOBS --------
+# One job per source: fetch, then publish straight away. They run on a small
+# worker pool, so a hanging Finavia or FMI request never holds up the buses.
+
+def fetch_weather():
+    w = timed_fetch(
+        "weather", get_weather,
+        cfg.get("openweather_key"),
+        cfg.get("weather_city", "Vantaa")
+    )
+
+    # track temperature history
+    new_temp = w.get("temp")
+    if isinstance(new_temp, (int, float)):
+        last_temps.append(new_temp)
+
+    # Compute trend from history
+    if len(last_temps) >= 3:  # need a few points
+        diff = last_temps[-1] - last_temps[0]
+        if diff > 0.3:
+            w["trend"] = "^"
+        elif diff < -0.3:
+            w["trend"] = "v"
+        else:
+            w["trend"] = "-"
+    else:
+        w["trend"] = ""  # not enough history yet
+
+    publish(weather=w)
+
+def fetch_fmi():
+    publish(ped_warning=timed_fetch("fmi", get_pedestrian_warning, cfg.get("fmi_areacode", "FI-18")))
+
+# offline timetable built from the GTFS zip; the API then only has to
+# supply the estimates of the buses about to leave
+HSL_GTFS_ZIP = cfg.get("hsl_gtfs_zip")
+HSL_GTFS_INDEX = os.path.join(HERE, cfg.get("hsl_gtfs_index", "hsl_gtfs.idx"))
+HSL_OFFLINE = bool(HSL_GTFS_ZIP) or os.path.exists(HSL_GTFS_INDEX)
+hsl_timetable = None
+
+# the next hour of buses is kept between polls; most polls only refresh
+# the estimates of the ones about to leave. Shrinks to the near window
+# once the offline timetable is loaded.
+HSL_NEAR_SEC = cfg.get("hsl_near_min", 15) * 60
+hsl_horizon = Horizon(
+    horizon_sec=cfg.get("hsl_horizon_min", 60) * 60,
+    max_departures=cfg.get("hsl_horizon_departures", 30),
+    near_sec=HSL_NEAR_SEC,
+)
+HSL_DEPARTURES = cfg.get("hsl_departures", 8)
+
+def load_hsl_timetable():
+    """
+    Load the offline timetable, (re)building it from hsl_gtfs_zip first if
+    needed. Building takes minutes on a Pi, so this runs on its own thread;
+    until it's done the bus board shows the live horizon alone.
+    """
+    global hsl_timetable
+    try:
+        timetable = Timetable.load_or_build(
+            HSL_GTFS_INDEX, HSL_GTFS_ZIP, [stop_id for stop_id, _ in HSL_STOPS])
+    except Exception as e:
+        logging.getLogger("hsl").warning("no offline timetable: %r", e)
+        return
+    hsl_horizon.horizon_sec = HSL_NEAR_SEC
+    hsl_timetable = timetable
+    fetch_sched.refresh_now(["hsl"])
+
+def fetch_hsl():
+    # every stop in one GraphQL request
+    buses = timed_fetch(
+        "hsl", hsl_horizon.fetch, cfg.get("hsl_key"),
+        [stop_id for stop_id, _ in HSL_STOPS], HSL_DEPARTURES)
+
+    timetable = hsl_timetable
+    if timetable is not None:
         now = time.time()
-
-        # ---------- WEATHER (only when screen ON, or forced) ----------
-        if backlight_on and (now - last_weather >= weather_interval or force_refresh or initial_refresh):
-            w = get_weather(
-                cfg.get("openweather_key"),
-                cfg.get("weather_city", "Vantaa")
-            )
-            p = get_pedestrian_warning(cfg.get("fmi_areacode", "FI-18"))
-
-            # track temperature history
-            new_temp = w.get("temp")
-            if isinstance(new_temp, (int, float)):
-                last_temps.append(new_temp)
-
-            # Compute trend from history
-            if len(last_temps) >= 3:  # need a few points
-                diff = last_temps[-1] - last_temps[0]
-                if diff > 0.3:
-                    w["trend"] = "^"
-                elif diff < -0.3:
-                    w["trend"] = "v"
-                else:
-                    w["trend"] = "-"
-            else:
-                w["trend"] = ""  # not enough history yet
-
-            with lock:
-                state["weather"] = w
-                state["ped_warning"] = p
-
-            last_weather = now
-
-        # ---------- HSL BUS TIMES ----------
-        # Slower interval when backlight is OFF
-        this_hsl_interval = hsl_interval if backlight_on else hsl_interval_off
-        if (now - last_hsl >= this_hsl_interval) or force_refresh or initial_refresh:
-            b1 = get_stop_times(cfg.get("hsl_key"), cfg.get("hsl_stop_1"))
-            b2 = get_stop_times(cfg.get("hsl_key"), cfg.get("hsl_stop_2"))
-            with lock:
-                state["buses_stop_1"] = b1
-                state["buses_stop_2"] = b2
-            last_hsl = now
-
-        # ---------- FLIGHTS (only when screen ON, or forced) ----------
-        if backlight_on and (now - last_flights >= flight_interval or force_refresh or initial_refresh):
-            f = get_flights(cfg.get("finavia_key"))
-            with lock:
-                state["flights"] = f
-                state["arrivals"] = get_arrivals(cfg.get("finavia_key"))
-            last_flights = now
-
-        # ---------- ELECTRICITY PRICES ----------
-        if (now - last_energy >= energy_interval or force_refresh or initial_refresh):
-            elec = get_spot_prices(cfg.get("electricity_hours_ahead", 36))
-            with lock:
-                state["electricity"] = elec
-            last_energy = now
-                
-
-        # if we were asked for an immediate refresh, clear the flag now
-        if force_refresh:
-            force_refresh = False
-
-        # initial run is completed
-        if initial_refresh:
-            initial_refresh = False
-        # Do NOT turn off backlight here — override takes control
-        # Simply exit initial setup without touching backlight
-
-        time.sleep(1)
-
-# start updater thread
-t = threading.Thread(target=updater_loop, daemon=True)
-t.start()
+        for i, (stop_id, _) in enumerate(HSL_STOPS):
+            planned = timetable.next_departures(
+                stop_id, now - LATE_SLACK_SEC, cfg.get("hsl_horizon_departures", 30))
+            if planned:
+                buses[i] = overlay(planned, buses[i], now)
+    publish(buses=buses)
+
+def fetch_departures():
+    publish(flights=timed_fetch(
+        "departures", get_flights, cfg.get("finavia_key"), cfg.get("flight_board_limit", 200)))
+
+def fetch_arrivals():
+    publish(arrivals=timed_fetch(
+        "arrivals", get_arrivals, cfg.get("finavia_key"), cfg.get("flight_board_limit", 200)))
+
+def fetch_energy():
+    publish(electricity=timed_fetch("energy", get_spot_prices, cfg.get("electricity_hours_ahead", 36)))
+
+def hsl_interval():
+    # Slower interval when backlight is OFF
+    if backlight_on:
+        return cfg.get("hsl_interval_sec", 60)
+    return cfg.get("hsl_interval_off_sec", 120)
+
+def weather_interval():
+    return cfg.get("weather_interval_sec", 300)      # default 5 min
+
+def flight_interval():
+    return cfg.get("flight_interval_sec", 60)        # default 1 min
+
+def energy_interval():
+    return cfg.get("energy_interval_sec", 600)       # default every 10 minutes
+
+# (source, job, interval in s, only while the screen is ON)
+FETCH_JOBS = [
+    ("weather", fetch_weather, weather_interval, True),
+    ("fmi", fetch_fmi, weather_interval, True),
+    ("hsl", fetch_hsl, hsl_interval, False),
+    ("departures", fetch_departures, flight_interval, True),
+    ("arrivals", fetch_arrivals, flight_interval, True),
+    ("energy", fetch_energy, energy_interval, False),
+]
+
+def screen_is_on():
+    return backlight_on
+
+# Fetch deadlines per source; the updater thread sleeps until the next one
+# or a refresh_now(). At most one job per source is in flight, so one
+# worker per source means a hung source can never make another one queue.
+fetch_sched = FetchScheduler(
+    ThreadPoolExecutor(max_workers=cfg.get("fetch_workers", len(FETCH_JOBS)),
+                       thread_name_prefix="fetch"),
+    jitter=cfg.get("fetch_jitter", 0.1),
+)
+for _source, _job, _interval, _screen_only in FETCH_JOBS:
+    fetch_sched.add(_source, _job, _interval, when=screen_is_on if _screen_only else None)
 
 # helpers
-def draw_text(text, x, y, fnt=base_font, color=GREEN):
-    surf = fnt.render(str(text), True, color)
-    screen.blit(surf, (x, y))
+
+# where draw_text renders by default; swapped by render_into()
+canvas = frame
+
+@contextmanager
+def render_into(surface):
+    """Temporarily point draw_text at an offscreen surface."""
+    global canvas
+    prev, canvas = canvas, surface
+    try:
+        yield surface
+    finally:
+        canvas = prev
+
+def draw_text(text, x, y, fnt=base_font, color=GREEN, target=None):
+    """Draw text on the canvas, or onto target (e.g. a chrome layer) if given."""
+    text = str(text)
+    surf = text_cache.render(fnt, text, color)
+    if target is None:
+        target = canvas
+    rect = target.blit(surf, (x, y))
+    if target is frame:
+        dirty.mark(rect, (text, fnt, color))
 
 def draw_scanlines():
-    for y in range(0, HEIGHT, 2):
-        pygame.draw.line(screen, DIM_GREEN, (0, y), (WIDTH, y), 1)
+    dirty.mark(effects.draw_scanlines(frame), "scanlines")
 
 def time_delta_str(event_time):
     """Return mission-style time delta string such as:
@@ -217,8 +404,6 @@ def draw_weather_ext_view():
     with lock:
         weather = state["weather"]
 
-    city_name = cfg.get("weather_city", "Vantaa").upper()
-
     temp = weather.get("temp")
     trend = weather.get("trend", "")
     feels = weather.get("feels_like", None)
@@ -253,9 +438,6 @@ def draw_weather_ext_view():
     if isinstance(feels, (int, float)):
         feels_str = f"{feels}°C"
 
-    # Clear screen area & title
-    draw_text(f"WEATHER SYSTEM STATUS - {city_name}", 20, 70, big_font, GREEN)
-
     y = 110
     line_h = 26
 
@@ -377,7 +559,6 @@ def draw_energy_view():
 
 
     if not elec or not elec.get("rows"):
-        draw_text("ENERGY PRICE STATUS", 20, 70, big_font, GREEN)
         draw_text("NO PRICE DATA", 20, 110, base_font, GREEN)
         return
 
@@ -389,9 +570,6 @@ def draw_energy_view():
     max_time = elec.get("max_time")
     min_time = elec.get("min_time")
 
-    # Title
-    draw_text("ENERGY PRICE STATUS", 20, 70, big_font, GREEN)
-
     # Current / min / max line
     y = 100
     if cur_price is not None:
@@ -406,15 +584,20 @@ def draw_energy_view():
 
     info_line = f"NOW {cur_str}   MIN {min_str} @ {min_t_str}   MAX {max_str} @ {max_t_str}"
     draw_text(info_line, 20, y, base_font, GREEN)
-    y += 30
+    y += 50  # column headers live in the chrome layer
 
-    # Column headers
-    draw_text("TIME", 20, y, base_font, GREEN)
-    draw_text("PRICE", 90, y, base_font, GREEN)
-    draw_text("Δ", 170, y, base_font, GREEN)
-    draw_text("BAR", 200, y, base_font, GREEN)
-    y += 20
+    # SEVERE rows blink, so they are drawn per frame by draw_energy_blink()
+    draw_energy_rows(rows, y, severe=False)
 
+def draw_energy_blink():
+    """Flashing SEVERE rows, drawn live on top of the cached energy body."""
+    with lock:
+        elec = state.get("electricity")
+    if elec and elec.get("rows"):
+        draw_energy_rows(elec["rows"], 150, severe=True)
+
+def draw_energy_rows(rows, y, severe):
+    """Price table rows; only the SEVERE ones if severe, else all the others."""
     # Determine scaling – option 1: max visible price
     prices_only = [r["price"] for r in rows if r["price"] is not None]
     if prices_only:
@@ -454,10 +637,10 @@ def draw_energy_view():
                 level_color = RED
             elif level == "SEVERE":
                 # flashing red
-                if (ticks // 300) % 2 == 0:
+                if (ticks // SEVERE_BLINK_MS) % 2 == 0:
                     level_color = RED
                 else:
-                    level_color = (120, 0, 0)
+                    level_color = DARK_RED
             else:
                 level_color = DIM_GREEN
 
@@ -473,236 +656,343 @@ def draw_energy_view():
         else:
             hh_display = f" {hh} "
 
-        draw_text(hh_display, 20, y, base_font, row_color)
-        draw_text(price_str, 90, y, base_font, row_color)
-        draw_text(trend, 170, y, base_font, row_color)
-        if bar_str:
-            draw_text(bar_str, 200, y, base_font, row_color)
+        if (level == "SEVERE" and price is not None) == severe:
+            draw_text(hh_display, 20, y, base_font, row_color)
+            draw_text(price_str, 90, y, base_font, row_color)
+            draw_text(trend, 170, y, base_font, row_color)
+            if bar_str:
+                draw_text(bar_str, 200, y, base_font, row_color)
 
         y += 20
         if y > 440:
             break
 
-def draw_arrivals_view():
-    draw_text("ARRIVALS HELSINKI-VANTAA", 20, 70, big_font, GREEN)
-    col_y = 100
-
-    headers = ["TIME","FLT","FROM","TYPE","REG","STD","CALLSIGN","STA","ETA"]
-    cols = [20, 90, 160, 230, 300, 450, 520, 660, 720]
+SEVERE_BLINK_MS = 300
 
-    for txt, x in zip(headers, cols):
-        draw_text(txt, x, col_y, base_font, GREEN)
+def energy_blink_next(now_ms):
+    """Next blink phase change, or None when there is nothing flashing."""
+    with lock:
+        elec = state.get("electricity")
+    if not elec:
+        return None
+    if any(r["level"] == "SEVERE" for r in elec.get("rows", [])[:14]):
+        return next_phase(now_ms, SEVERE_BLINK_MS)
+    return None
+
+# Board layouts: (header, x) per column, shared by chrome and rows
+ARRIVALS_TABLE = Table([
+    ("TIME", 20), ("FLT", 90), ("FROM", 160), ("TYPE", 230), ("REG", 300),
+    ("STD", 450), ("CALLSIGN", 520), ("STA", 660), ("ETA", 720),
+], base_font, text_cache, like=like)
+
+DEPARTURES_TABLE = Table([
+    ("TIME", 20), ("FLT", 90), ("TO", 160), ("TYPE", 230), ("REG", 300),
+    ("GTE", 390), ("STD", 450), ("CALLSIGN", 520), ("STA", 660), ("ETD", 720),
+], base_font, text_cache, like=like)
+
+HSL_TABLE = Table([
+    ("TIME", 20), ("ROUTE", 120), ("MIN", 200), ("DEST", 260), ("STATUS", 450),
+], base_font, text_cache, like=like)
+
+# -------- SCROLLING BOARDS --------
+# Flight and bus lists can be far longer than the screen. Their rows are not
+# part of the cached body: every frame draws just the rows inside the
+# board's area at the scroller's position (plus a few about to scroll in),
+# from the tables' row cache, so a frame costs the same for 20 or 500 rows.
+
+BOARD_PREFETCH = 2  # rows below the area composed ahead of time
+
+def make_scroller(pitch, rows):
+    return Scroller(
+        pitch, rows,
+        mode=cfg.get("board_scroll", "scroll"),
+        speed=cfg.get("board_scroll_px_s", 26),
+        hold_ms=int(cfg.get("board_hold_sec", 4) * 1000),
+    )
+
+def draw_board(table, rows, cells, area, pitch, scroller):
+    """
+    Draw the part of rows that falls inside area. cells(row) gives the
+    (text, color) tuple for one row; it is only called for rows in view,
+    and what it returned is what decides whether the area is dirty.
+    """
+    n = len(rows)
+    offset = scroller.offset(n, pygame.time.get_ticks())
+    first, shift = divmod(offset, pitch)
+    in_view = area.height // pitch + 1
+
+    drawn = []
+    frame.set_clip(area)
+    y = area.top - shift
+    for i in range(first, min(n, first + in_view)):
+        row_cells = cells(rows[i])
+        table.draw_row(frame, row_cells, y)
+        drawn.append(row_cells)
+        y += pitch
+    frame.set_clip(None)
+
+    for i in range(first + in_view, min(n, first + in_view + BOARD_PREFETCH)):
+        table.row_surface(cells(rows[i]))
+
+    dirty.mark(area, (id(table), area.top, offset, tuple(drawn)))
+
+def flight_status_color(f):
+    return RED if f.status == "CAN" else YELLOW if f.status == "DEL" else GREEN
+
+def arrival_cells(f):
+    if not isinstance(f, Flight):
+        return ((str(f), WHITE),)
+
+    return (
+        (f.time, GREEN), (f.flight, GREEN), (f.route, GREEN), (f.actype, GREEN),
+        (f.reg, GREEN), (f.stand, GREEN), (f.callsign, GREEN),
+        (f.status, flight_status_color(f)),
+        # ETA yellow if delayed and has new time
+        (f.new_time, YELLOW if f.status == "DEL" else GREEN),
+    )
+
+def departure_cells(f):
+    if not isinstance(f, Flight):
+        return ((str(f), GREEN),)
+
+    # Flight base info (always green), ETD only when delayed
+    return (
+        (f.time, GREEN), (f.flight, GREEN), (f.route, GREEN), (f.actype, GREEN),
+        (f.reg, GREEN), (f.gate, GREEN), (f.stand, GREEN), (f.callsign, GREEN),
+        (f.status, flight_status_color(f)),
+        (f.new_time if f.status == "DEL" else "", YELLOW),
+    )
+
+@lru_cache(maxsize=256)
+def hhmm(epoch):
+    return time.strftime("%H:%M", time.localtime(epoch))
+
+def hsl_cells(row, now):
+    """
+    One bus row, with minutes and status worked out for now (epoch s)
+    rather than when the data was fetched.
+    """
+    if not isinstance(row, Departure):
+        return ((str(row), GREEN),)
+
+    mins = int((row.realtime - now) / 60)
+    delay = (row.realtime - row.scheduled) / 60.0
+
+    if mins < 5:
+        color = RED
+        stat_txt = "RUN!!!"
+    elif delay > 1.5:
+        color = YELLOW
+        stat_txt = "DEL"
+    else:
+        color = GREEN
+        stat_txt = "OK"
 
-    y = col_y + 28
+    return (
+        (hhmm(row.scheduled), GREEN), (row.route, GREEN), (f"{mins:>2}", GREEN),
+        (row.headsign, GREEN), (stat_txt, color),
+    )
 
+def hsl_board_rows(rows, now):
+    """
+    The next hsl_departures buses of one stop that haven't left by now,
+    or a one-line message.
+    """
+    if not rows or any(isinstance(r, str) and "Load" in r for r in rows):
+        return ["Loading HSL data..."]
+    if len(rows) == 1 and isinstance(rows[0], str):
+        return rows
+    upcoming = [row for row in rows if isinstance(row, Departure) and row.realtime >= now]
+    return upcoming[:HSL_DEPARTURES] or ["No upcoming departures"]
+
+ARRIVALS_PITCH = 24
+ARRIVALS_AREA = pygame.Rect(0, 100 + 28, WIDTH, 14 * ARRIVALS_PITCH)
+arrivals_scroller = make_scroller(ARRIVALS_PITCH, 14)
+
+DEPARTURES_PITCH = 26
+DEPARTURES_AREA = pygame.Rect(0, 95 + 30, WIDTH, 13 * DEPARTURES_PITCH)  # first flight row starts lower
+departures_scroller = make_scroller(DEPARTURES_PITCH, 13)
+
+# The HSL view shows hsl_stops_per_screen stops at a time, each in a fixed
+# section (title, headers, rows), and pages through longer stop lists.
+HSL_PER_SCREEN = max(1, cfg.get("hsl_stops_per_screen", 2))
+HSL_PAGE_MS = int(cfg.get("hsl_page_sec", 10) * 1000)
+HSL_TOP = 70
+HSL_SECTION_H = (HEIGHT - HSL_TOP) // HSL_PER_SCREEN  # 205 for two stops
+HSL_PITCH = 26
+HSL_ROWS = max(1, (HSL_SECTION_H - 55) // HSL_PITCH)
+HSL_SECTIONS = [HSL_TOP + i * HSL_SECTION_H for i in range(HSL_PER_SCREEN)]
+HSL_AREAS = [pygame.Rect(0, top + 55, WIDTH, HSL_ROWS * HSL_PITCH) for top in HSL_SECTIONS]
+hsl_scrollers = tuple(make_scroller(HSL_PITCH, HSL_ROWS) for _ in HSL_SECTIONS)
+
+BOARD_SCROLLERS = (arrivals_scroller, departures_scroller) + hsl_scrollers
+
+def hsl_page_stops(now_ms):
+    """Indexes into HSL_STOPS on screen at now_ms."""
+    pages = -(-len(HSL_STOPS) // HSL_PER_SCREEN)
+    page = (now_ms // HSL_PAGE_MS) % pages if pages > 1 else 0
+    first = page * HSL_PER_SCREEN
+    return list(range(first, min(len(HSL_STOPS), first + HSL_PER_SCREEN)))
+
+def draw_arrivals_board():
     with lock:
         arrs = state["arrivals"]
+    draw_board(ARRIVALS_TABLE, arrs, arrival_cells,
+               ARRIVALS_AREA, ARRIVALS_PITCH, arrivals_scroller)
 
-    for row in arrs[:10]:
-        if not isinstance(row, (list, tuple)): 
-            draw_text(str(row), 20, y, base_font, WHITE)
-            y += 24
-            continue
-
-        t, flt, frm, ac, reg, stand, call, status, eta = row
-        color = RED if status=="CAN" else YELLOW if status=="DEL" else GREEN
-
-        data = [t, flt, frm, ac, reg, stand, call, status, eta]
-        for i, (value, x) in enumerate(zip(data, cols)):
-            # STATUS (index 7)
-            if i == 7:
-                draw_text(value, x, y, base_font, color)
-            # ETA (index 8) if delayed and has new time
-            elif i == 8 and status == "DEL":
-                draw_text(value, x, y, base_font, YELLOW)
-            # Everything else green
-            else:
-                draw_text(value, x, y, base_font, GREEN)
-        y += 24
-
-
-
-# -------- BACKLIGHT / TIME WINDOW HELPERS --------
-
-def set_backlight(on: bool):
-    """Control official RPi touchscreen backlight."""
-    global backlight_on
-    try:
-        if on and not backlight_on:
-            os.system("sudo sh -c 'echo 0 > /sys/class/backlight/rpi_backlight/bl_power'")
-            backlight_on = True
-        elif not on and backlight_on:
-            os.system("sudo sh -c 'echo 1 > /sys/class/backlight/rpi_backlight/bl_power'")
-            backlight_on = False
-    except Exception:
-        # Fail silently; app still runs even if backlight write fails
-        pass
-
-def in_on_window():
-    now = time.localtime()
-    current = now.tm_hour * 60 + now.tm_min
-
-    for w in cfg.get("screen_on_windows", []):
-        start_h, start_m = map(int, w["start"].split(":"))
-        end_h, end_m = map(int, w["end"].split(":"))
-
-        start = start_h * 60 + start_m
-        end   = end_h * 60 + end_m
-
-        if start <= current <= end:
-            return True
-
-    return False
-
-def run_greeting_sequence():
-    """Blocking WOPR-style greeting when waking via touch."""
-    global in_greeting
-    in_greeting = True
-
-    screen.fill(BLACK)
-    pygame.display.flip()
-    pygame.time.delay(600)
-
-    msg1 = "GREETINGS PROFESSOR FALKEN."
-    msg2 = "HOW ARE YOU FEELING TODAY?"
-
-    x = 20
-    y1 = 140
-    y2 = 180
-
-    # Typewriter for line 1
-    for ch in msg1:
-        draw_text(ch, x, y1, big_font, GREEN)
-        x += big_font.size(ch)[0]
-        pygame.display.flip()
-        pygame.time.delay(60)
-
-    pygame.time.delay(800)
-
-    # Typewriter for line 2
-    x = 20
-    for ch in msg2:
-        draw_text(ch, x, y2, big_font, GREEN)
-        x += big_font.size(ch)[0]
-        pygame.display.flip()
-        pygame.time.delay(60)
-
-    pygame.time.delay(1200)
-    in_greeting = False
-
-# boot animation (simple)
-def boot_sequence():
-    screen.fill(BLACK)
-    draw_text("INITIALISING WOPR TERMINAL...", 20, 40, big_font)
-    pygame.display.flip()
-    time.sleep(1.2)
-    msg = "GREETINGS PROFESSOR FALKEN."
-    x = 20
-    for ch in msg:
-        draw_text(ch, x, 80, big_font)
-        x += big_font.size(ch)[0]
-        pygame.display.flip()
-        time.sleep(0.06)
-    time.sleep(0.6)
-
-boot_sequence()
-
-# Service restart wake behavior
-set_backlight(True)
-backlight_on = True
-last_activity = pygame.time.get_ticks()
-force_refresh = True   # immediate data sync once
-initial_refresh = True
-overrode_schedule = True
-
-# main loop
-clock = pygame.time.Clock()
-
-# Double-tap detection
-DOUBLE_TAP_TIME = 400  # ms
-last_tap_time = 0
-tap_count = 0
-
-# activity tracking for timeout
-last_activity = pygame.time.get_ticks()
-
-while True:
-    now_ticks = pygame.time.get_ticks()
-   
-    for ev in pygame.event.get():
-        # -- Touchscreen input --
-        if ev.type == pygame.FINGERDOWN:
-            now_ticks = pygame.time.get_ticks()
-            last_activity = now_ticks
-
-            # If screen is OFF → wake it up and skip toggling behavior
-            if not backlight_on:
-                set_backlight(True)
-                backlight_on = True
-                overrode_schedule = True  # prevent instant turn-off
-                force_refresh = True
-                initial_refresh = True
-                continue  # DO NOT toggle views
-
-            # Convert touch to synthetic mouse click
-            mx = int(ev.x * WIDTH)
-            my = int(ev.y * HEIGHT)
-            pygame.event.post(pygame.event.Event(
-                pygame.MOUSEBUTTONDOWN, {'pos': (mx, my), 'button': 1}
-            ))
-
-        # -- Normal mouse / converted touch click --
-        if ev.type == pygame.MOUSEBUTTONDOWN:
-            now_ticks = pygame.time.get_ticks()
-            last_activity = now_ticks
-
-            if not backlight_on or in_greeting:
-                continue  # ignore toggle while waking / greeting
-
-            # double-tap for switching screens
-            if now_ticks - last_tap_time <= DOUBLE_TAP_TIME:
-                tap_count += 1
-            else:
-                tap_count = 1
-
-            last_tap_time = now_ticks
-            if tap_count >= 2:
-                current_view = (current_view + 1) % 5  # HSL, WX, ELEC, DEP, ARR
-                tap_count = 0
+def arrivals_next(now_ms):
+    with lock:
+        n = len(state["arrivals"])
+    return arrivals_scroller.next_change(n, now_ms)
 
-    
-    # ---- Backlight scheduling / timeout with override ----
-    idle_ms = now_ticks - last_activity
+def draw_departures_board():
+    """Departing flights board."""
+    with lock:
+        flights = state["flights"]
+    draw_board(DEPARTURES_TABLE, flights, departure_cells,
+               DEPARTURES_AREA, DEPARTURES_PITCH, departures_scroller)
 
-    if overrode_schedule:
-        # Ignore schedule until override timeout
-        if idle_ms > BACKLIGHT_TIMEOUT:
-            overrode_schedule = False
-    else:
-        # Normal time-based scheduling
-        if in_on_window():
-            set_backlight(True)
-        else:
-            if backlight_on and idle_ms > BACKLIGHT_TIMEOUT:
-                set_backlight(False)
+def departures_next(now_ms):
+    with lock:
+        n = len(state["flights"])
+    return departures_scroller.next_change(n, now_ms)
 
-    # If backlight is OFF → skip drawing to prevent accidental wake flicker
-    if not backlight_on:
-        screen.fill(BLACK)
-        pygame.display.flip()
-        clock.tick(10)
-        continue
+def stop_rows(buses, ix):
+    return buses[ix] if ix < len(buses) else []
 
-    # Normal drawing when backlight is ON and not in greeting
-    screen.fill(BLACK)
+def draw_hsl_boards():
+    """HSL bus view: the stops of the current page, each scrolling on its own."""
+    with lock:
+        buses = state["buses"]
+    now = time.time()
+    stops = hsl_page_stops(pygame.time.get_ticks())
+    for ix, area, scroller in zip(stops, HSL_AREAS, hsl_scrollers):
+        draw_board(HSL_TABLE, hsl_board_rows(stop_rows(buses, ix), now),
+                   lambda row: hsl_cells(row, now), area, HSL_PITCH, scroller)
+
+def hsl_next(now_ms):
+    with lock:
+        buses = state["buses"]
+    now = time.time()
+    changes = [scroller.next_change(len(hsl_board_rows(stop_rows(buses, ix), now)), now_ms)
+               for ix, scroller in zip(hsl_page_stops(now_ms), hsl_scrollers)]
+    if len(HSL_STOPS) > HSL_PER_SCREEN:
+        changes.append(next_phase(now_ms, HSL_PAGE_MS))
+    # the soonest countdown (or departed bus) on screen ticking over
+    for ix in hsl_page_stops(now_ms):
+        for row in hsl_board_rows(stop_rows(buses, ix), now):
+            if isinstance(row, Departure):
+                left = row.realtime - now
+                changes.append(now_ms + int((left % 60) * 1000) + 1)
+    changes = [t for t in changes if t is not None]
+    return min(changes) if changes else None
+
+
+# -------- STATIC VIEW CHROME --------
+# Titles, column headers and stop descriptions. Each view declares a key
+# (the config / coarse state its chrome depends on) and a builder; the
+# builder runs only when the key changes.
+
+def draw_headers(target, headers, y):
+    for txt, x in headers:
+        draw_text(txt, x, y, base_font, GREEN, target)
+
+def hsl_chrome_key():
+    # the descriptions of the stops on the current page
+    return tuple(HSL_STOPS[ix][1] for ix in hsl_page_stops(pygame.time.get_ticks()))
+
+def draw_hsl_chrome(target):
+    for desc, top in zip(hsl_chrome_key(), HSL_SECTIONS):
+        draw_text(desc.upper(), 20, top, big_font, GREEN, target)
+        HSL_TABLE.draw_headers(target, top + 30, GREEN)
+
+def weather_ext_chrome_key():
+    return cfg.get("weather_city", "Vantaa")
+
+def draw_weather_ext_chrome(target):
+    city_name = weather_ext_chrome_key().upper()
+    draw_text(f"WEATHER SYSTEM STATUS - {city_name}", 20, 70, big_font, GREEN, target)
+
+def energy_chrome_key():
+    with lock:
+        elec = state.get("electricity")
+    return bool(elec and elec.get("rows"))
+
+def draw_energy_chrome(target):
+    draw_text("ENERGY PRICE STATUS", 20, 70, big_font, GREEN, target)
+    if energy_chrome_key():
+        draw_headers(target, [("TIME", 20), ("PRICE", 90), ("Δ", 170), ("BAR", 200)], 130)
+
+def draw_departures_chrome(target):
+    draw_text("DEPARTURES HELSINKI-VANTAA", 20, 70, big_font, GREEN, target)
+    DEPARTURES_TABLE.draw_headers(target, 95, GREEN)
+
+def draw_arrivals_chrome(target):
+    draw_text("ARRIVALS HELSINKI-VANTAA", 20, 70, big_font, GREEN, target)
+    ARRIVALS_TABLE.draw_headers(target, 100, GREEN)
+
+def no_chrome_key():
+    return None
+
+def current_minute():
+    return int(time.time() // 60)
+
+def no_tick_key():
+    return None
+
+# Per view: body renderer (None if all of it is live), chrome (key + builder),
+# the state keys the body reads,
+# a tick key for time-dependent text (e.g. "x MIN AGO"), an optional
+# per-frame animation drawn on top of the cached body, and when that
+# animation next changes (for the frame scheduler).
+VIEWS = {
+    VIEW_HSL: {
+        "draw": None,
+        "chrome": (hsl_chrome_key, draw_hsl_chrome),
+        "reads": (),
+        "tick_key": no_tick_key,
+        "animate": draw_hsl_boards,
+        "next_change": hsl_next,
+    },
+    VIEW_WEATHER_EXT: {
+        "draw": draw_weather_ext_view,
+        "chrome": (weather_ext_chrome_key, draw_weather_ext_chrome),
+        "reads": ("weather",),
+        "tick_key": current_minute,
+        "animate": None,
+        "next_change": None,
+    },
+    VIEW_ELECTRICITY: {
+        "draw": draw_energy_view,
+        "chrome": (energy_chrome_key, draw_energy_chrome),
+        "reads": ("electricity",),
+        "tick_key": no_tick_key,
+        "animate": draw_energy_blink,
+        "next_change": energy_blink_next,
+    },
+    VIEW_DEPARTURES: {
+        "draw": None,
+        "chrome": (no_chrome_key, draw_departures_chrome),
+        "reads": (),
+        "tick_key": no_tick_key,
+        "animate": draw_departures_board,
+        "next_change": departures_next,
+    },
+    VIEW_ARRIVALS: {
+        "draw": None,
+        "chrome": (no_chrome_key, draw_arrivals_chrome),
+        "reads": (),
+        "tick_key": no_tick_key,
+        "animate": draw_arrivals_board,
+        "next_change": arrivals_next,
+    },
+}
 
-    # TIME top-right (always visible)
-    now = time.localtime()
-    dt_str = time.strftime("%d.%m.%Y %H:%M:%S", now)
-    clock_text = base_font.render(dt_str, True, GREEN)
-    rect = clock_text.get_rect(topright=(WIDTH - 20, 10))
-    screen.blit(clock_text, rect)
+# every view shows the weather line under the clock
+TOP_LINE_READS = ("weather", "ped_warning")
 
+def draw_top_line():
+    """Weather line under the clock, shared by every view."""
     # WEATHER (always visible - now with hazard awareness)
     with lock:
         weather = state["weather"]
@@ -713,7 +1003,7 @@ while True:
     desc = weather.get("desc", "")
     trend = weather.get("trend", "")
     wind_speed = weather.get("wind_speed", "")
-    wind_dir = weather.get("wind_dir", "")  
+    wind_dir = weather.get("wind_dir", "")
 
     # Build base weather string
     weather_base = f"{city}: {temp}°C {trend}"
@@ -758,179 +1048,374 @@ while True:
 
         if details:
             draw_text(details, cursor_x, 40, big_font, GREEN)
-    
-
-    if current_view == VIEW_HSL:
-        # =====================
-        #   HSL BUS VIEW (table)
-        # =====================
-        stop1_desc = cfg.get("hsl_stop_1_desc", "").upper()
-        draw_text(stop1_desc, 20, 70, big_font)
-        draw_text("TIME", 20, 100, base_font, GREEN)
-        draw_text("ROUTE", 120, 100, base_font, GREEN)
-        draw_text("MIN", 200, 100, base_font, GREEN)
-        draw_text("DEST", 260, 100, base_font, GREEN)
-        draw_text("STATUS", 450, 100, base_font, GREEN)
-
-        y = 125
-        with lock:
-            city_rows = state["buses_stop_1"][:5]
-
-        if not city_rows or any("Load" in str(r) for r in city_rows):
-            draw_text("Loading HSL data...", 20, y, base_font, GREEN)
-            y += 26
-        elif len(city_rows) == 1 and isinstance(city_rows[0], str) and "No" in city_rows[0]:
-            draw_text("No upcoming departures", 20, y, base_font, GREEN)
-            y += 26
-        else:
-            with lock:
-                for row in city_rows:
-                    if not (isinstance(row, (list, tuple)) and len(row) == 5):
-                        continue
-                    t, route, mins, dest, stat = row
-
-                    if stat == "RUN":
-                        color = RED
-                        stat_txt = "RUN!!!"
-                    elif stat == "DEL":
-                        color = YELLOW
-                        stat_txt = "DEL"
-                    else:
-                        color = GREEN
-                        stat_txt = "OK"
-
-                    draw_text(t,      20, y, base_font, GREEN)
-                    draw_text(route, 120, y, base_font, GREEN)
-                    draw_text(f"{mins:>2}",  200, y, base_font, GREEN)
-                    draw_text(dest,  260, y, base_font, GREEN)
-                    draw_text(stat_txt, 450, y, base_font, color)
-
-                    y += 26
-
-        # move down for airport direction
-        y += 20
-        stop2_desc = cfg.get("hsl_stop_2_desc", "").upper()
-        draw_text(stop2_desc, 20, y, big_font, GREEN)
-        y += 30
-        draw_text("TIME", 20, y, base_font, GREEN)
-        draw_text("ROUTE", 120, y, base_font, GREEN)
-        draw_text("MIN", 200, y, base_font, GREEN)
-        draw_text("DEST", 260, y, base_font, GREEN)
-        draw_text("STATUS", 450, y, base_font, GREEN)
-
-        y += 25
-
-        with lock:
-            air_rows = state["buses_stop_2"][:5]
-
-        if not air_rows or any("Load" in str(r) for r in air_rows):
-            draw_text("Loading HSL data...", 20, y, base_font, GREEN)
-        elif len(air_rows) == 1 and isinstance(air_rows[0], str) and "No" in air_rows[0]:
-            draw_text("No upcoming departures", 20, y, base_font, GREEN)
+
+def body_key(view):
+    spec = VIEWS[view]
+    with lock:
+        versions = tuple(state_version[k] for k in TOP_LINE_READS + spec["reads"])
+    return (view, spec["chrome"][0](), versions, spec["tick_key"]())
+
+def draw_body(view):
+    """
+    Start the frame with the fully rendered view: one blit while the data
+    it shows is unchanged, a re-render only when a version or tick key moved.
+    """
+    spec = VIEWS[view]
+    key = body_key(view)
+
+    def build(surface):
+        chrome_key_fn, build_chrome = spec["chrome"]
+        chrome_key = (view, chrome_key_fn())
+        surface.blit(chrome.get(chrome_key, build_chrome), (0, 0))
+        with render_into(surface):
+            draw_top_line()
+            if spec["draw"]:
+                spec["draw"]()
+
+    layer = body.get(key, build)
+    dirty.mark(frame.blit(layer, (0, 0)), ("body", key))
+
+# -------- BACKLIGHT / TIME WINDOW HELPERS --------
+
+def set_backlight(on: bool):
+    """Control official RPi touchscreen backlight."""
+    global backlight_on
+    try:
+        if on and not backlight_on:
+            os.system("sudo sh -c 'echo 0 > /sys/class/backlight/rpi_backlight/bl_power'")
+            backlight_on = True
+        elif not on and backlight_on:
+            os.system("sudo sh -c 'echo 1 > /sys/class/backlight/rpi_backlight/bl_power'")
+            backlight_on = False
+    except Exception:
+        # Fail silently; app still runs even if backlight write fails
+        pass
+
+def in_on_window():
+    now = time.localtime()
+    current = now.tm_hour * 60 + now.tm_min
+
+    for w in cfg.get("screen_on_windows", []):
+        start_h, start_m = map(int, w["start"].split(":"))
+        end_h, end_m = map(int, w["end"].split(":"))
+
+        start = start_h * 60 + start_m
+        end   = end_h * 60 + end_m
+
+        if start <= current <= end:
+            return True
+
+    return False
+
+IDLE_MAX_MS = 60 * 60 * 1000  # re-check the schedule at least hourly
+
+def ms_until_window_start():
+    """Milliseconds until the next screen_on_windows start (capped)."""
+    now = time.localtime()
+    secs = now.tm_hour * 3600 + now.tm_min * 60 + now.tm_sec
+
+    best = IDLE_MAX_MS
+    for w in cfg.get("screen_on_windows", []):
+        start_h, start_m = map(int, w["start"].split(":"))
+        delta = (start_h * 3600 + start_m * 60 - secs) % 86400
+        # land just after the minute boundary so in_on_window() agrees
+        best = min(best, delta * 1000 + 500)
+
+    return best
+
+# Boot / wake animations play as timelines inside the main loop, so input
+# stays live and the first data frame can follow as soon as data is in.
+GREETING_STEPS = [
+    ("pause", 600),
+    ("type", "GREETINGS PROFESSOR FALKEN.", 20, 140, big_font, 60),
+    ("pause", 800),
+    ("type", "HOW ARE YOU FEELING TODAY?", 20, 180, big_font, 60),
+    ("pause", 1200),
+]
+
+BOOT_STEPS = [
+    ("text", "INITIALISING WOPR TERMINAL...", 20, 40, big_font),
+    ("pause", 1200),
+    ("type", "GREETINGS PROFESSOR FALKEN.", 20, 80, big_font, 60),
+    ("pause", 600),
+]
+
+def start_animation(steps):
+    """Begin a timeline; the next frames draw it instead of the view."""
+    dirty.invalidate()
+    return Timeline(steps, pygame.time.get_ticks())
+
+def present(palette=None):
+    """
+    Push only what changed; full flip after view switches or big changes.
+    In palette mode this is also where the 8-bit frame is converted to the
+    display, shown through palette (a flicker phase) if one is given.
+    """
+    rects = dirty.collect()
+    if frame is not screen:
+        if palette is not None:
+            frame.set_palette(palette)
+        if rects is None:
+            screen.blit(frame, (0, 0))
         else:
-            with lock:
-                for row in air_rows:
-                    if not (isinstance(row, (list, tuple)) and len(row) == 5):
-                        continue
-                    t, route, mins, dest, stat = row
-
-                    if stat == "RUN":
-                        color = RED
-                        stat_txt = "RUN!!!"
-                    elif stat == "DEL":
-                        color = YELLOW
-                        stat_txt = "DEL"
-                    else:
-                        color = GREEN
-                        stat_txt = "OK"
-
-                    draw_text(t,      20, y, base_font, GREEN)
-                    draw_text(route, 120, y, base_font, GREEN)
-                    draw_text(f"{mins:>2}", 200, y, base_font, GREEN)
-                    draw_text(dest,   260, y, base_font, GREEN)
-                    draw_text(stat_txt, 450, y, base_font, color)
-
-                    y += 26
-
-    elif current_view == VIEW_ELECTRICITY:
-        # =====================
-        #   ENERGY PRICE VIEW
-        # =====================
-        draw_energy_view()
-
-
-    elif current_view == VIEW_WEATHER_EXT:
-        # =====================
-        #   EXTENDED WEATHER VIEW
-        # =====================
-        draw_weather_ext_view()
-
-    elif current_view == VIEW_DEPARTURES:
-        # =====================
-        #   DERARTING FLIGHTS BOARD VIEW
-        # =====================
-        header_y = 70
-        column_y = 95
-        draw_text("DEPARTURES HELSINKI-VANTAA", 20, header_y, big_font)
-
-        draw_text("TIME", 20, column_y, base_font, GREEN)
-        draw_text("FLT", 90, column_y, base_font, GREEN)
-        draw_text("TO", 160, column_y, base_font, GREEN)
-        draw_text("TYPE", 230, column_y, base_font, GREEN)
-        draw_text("REG", 300, column_y, base_font, GREEN)
-        draw_text("GTE", 390, column_y, base_font, GREEN)
-        draw_text("STD", 450, column_y, base_font, GREEN)
-        draw_text("CALLSIGN", 520, column_y, base_font, GREEN)
-        draw_text("STA", 660, column_y, base_font, GREEN)
-        draw_text("ETD", 720, column_y, base_font, GREEN)
-
-        y = column_y + 30   # first flight row starts lower
-        with lock:
-            flights = state["flights"][:10]
-
-        for flight in flights:
-            if isinstance(flight, (list, tuple)) and len(flight) >= 10:
-                (ts, flt, dst, ac, reg, gate, stand, call, status, newt) = flight
-
-                # Flight base info (always green)
-                draw_text(ts,    20, y, base_font, GREEN)
-                draw_text(flt,   90, y, base_font, GREEN)
-                draw_text(dst,   160, y, base_font, GREEN)
-                draw_text(ac,    230, y, base_font, GREEN)
-                draw_text(reg,   300, y, base_font, GREEN)
-                draw_text(gate,  390, y, base_font, GREEN)
-                draw_text(stand, 450, y, base_font, GREEN)
-                draw_text(call,  520, y, base_font, GREEN)
-
-                if status == "CAN":
-                    color = RED
-                elif status == "DEL":
-                    color = YELLOW
-                else:
-                    color = GREEN
+            for rect in rects:
+                screen.blit(frame, rect, rect)
+        if palette is not None:
+            frame.set_palette(PALETTE)
+
+    if rects is None:
+        pygame.display.flip()
+    else:
+        pygame.display.update(rects)
+    if mirror:
+        mirror.capture(screen, rects)
 
-                draw_text(status, 660, y, base_font, color)
+def draw_animation(anim, now_ms):
+    frame.fill(BLACK)
+    anim.draw(now_ms, draw_text)
+    next_change = anim.next_change(now_ms)
+    if next_change is not None:
+        frame_sched.request_at(next_change)
 
-                if status == "DEL" and newt:
-                    draw_text(newt, 720, y, base_font, YELLOW)
-            else:
-                draw_text(str(flight), 20, y, base_font, GREEN)
+def render_frame(view):
+    """Draw and present one frame of a data view."""
+    draw_body(view)
 
-            y += 26
+    # TIME top-right (always visible)
+    now = time.localtime()
+    dt_str = time.strftime("%d.%m.%Y %H:%M:%S", now)
+    clock_text = clock_cache.render(base_font, dt_str, GREEN)
+    rect = clock_text.get_rect(topright=(WIDTH - 20, 10))
+    dirty.mark(frame.blit(clock_text, rect), dt_str)
 
-    elif current_view == VIEW_ARRIVALS:
-        draw_arrivals_view()
+    # live elements on top of the cached body (e.g. SEVERE price blink)
+    animate = VIEWS[view]["animate"]
+    if animate:
+        animate()
+    perf.lap("draw")
 
     if cfg.get("show_scanlines", True):
         draw_scanlines()
 
-    # flicker overlay (subtle)
+    # flicker overlay (subtle); in palette mode a dimmed palette instead
+    flicker_palette = None
     if cfg.get("enable_flicker", True):
-        alpha = 30 + (abs((pygame.time.get_ticks() // 50) % 6 - 3) * 10)
-        overlay = pygame.Surface((WIDTH, HEIGHT))
-        overlay.fill((0, 0, 0))
-        overlay.set_alpha(alpha)
-        screen.blit(overlay, (0, 0))
-
-    pygame.display.flip()
-    clock.tick(10)
\ No newline at end of file
+        ticks = pygame.time.get_ticks()
+        if PALETTE_MODE:
+            alpha, flicker_palette = effects.flicker_palette(ticks)
+        else:
+            alpha = effects.draw_flicker(frame, ticks)
+        dirty.mark(frame.get_rect(), ("flicker", alpha))
+
+    if show_hud:
+        draw_hud()
+    perf.lap("effects")
+
+    present(flicker_palette)
+    perf.lap("flip")
+    perf.add("lock", lock.take_waited())
+
+# double-tap here toggles the perf HUD instead of switching views
+HUD_CORNER = pygame.Rect(0, 0, 120, 60)
+
+def draw_hud():
+    """Perf overlay: FPS, frame time, per-phase p50/p99 and fetch latencies."""
+    lines = [
+        f"FPS {perf.fps():4.1f}   FRAME p50 {perf.frame.percentile(50):5.1f} ms"
+        f"   p99 {perf.frame.percentile(99):5.1f} ms",
+        "  ".join(f"{name} {r.percentile(50):.1f}/{r.percentile(99):.1f}"
+                  for name, r in perf.phases.items()),
+        "FETCH " + "  ".join(f"{src} {ms:.0f}ms" for src, ms in sorted(perf.fetch.items())),
+        "HTTP " + "  ".join(f"{(host.split('.')[-2:-1] or [host])[0]} {st['reused']}/{st['requests']} reused"
+                            for host, st in sorted(http.stats().items())),
+        "CACHE " + "  ".join(f"{src} {st['hit_rate'] * 100:.0f}% {st['bytes_saved'] / 1024.0:.0f}kB"
+                             for src, st in sorted((http.cache.stats() if http.cache else {}).items())),
+        f"HSL full {hsl_horizon.full} near {hsl_horizon.near} skip {hsl_horizon.skipped}"
+        f" fail {hsl_horizon.failed}  {hsl_horizon.bytes / 1024.0:.0f} kB",
+        "NEXT " + "  ".join(f"{src} {'now' if due is None else f'{due:.0f}s'}"
+                            for src, due in fetch_sched.queue()),
+        f"TOUCH p50 {perf.touch.percentile(50):.1f} ms   p99 {perf.touch.percentile(99):.1f} ms"
+        f"   target {TOUCH_LATENCY_TARGET_MS} ms"
+        + ("  !" if perf.touch.percentile(99) > TOUCH_LATENCY_TARGET_MS else ""),
+    ]
+    line_h = 18
+    y = HEIGHT - 6 - len(lines) * line_h
+    box = pygame.Rect(0, y - 4, WIDTH, HEIGHT - y + 4)
+    frame.fill(BLACK, box)
+    for line in lines:
+        # not via text_cache: these change every frame and would just churn it
+        frame.blit(hud_font.render(line, True, WHITE), (10, y))
+        y += line_h
+    dirty.mark(box, tuple(lines))
+
+def schedule_next_frame(view, now_ms):
+    """Next frame: when the clock's second rolls over, or sooner if animating."""
+    frame_sched.request_in(1001 - int(time.time() * 1000) % 1000)
+    if cfg.get("enable_flicker", True):
+        frame_sched.request_at(next_phase(now_ms, effects.phase_ms))
+    next_change = VIEWS[view]["next_change"]
+    if next_change:
+        t_next = next_change(now_ms)
+        if t_next is not None:
+            frame_sched.request_at(t_next)
+
+# Double-tap detection
+DOUBLE_TAP_TIME = 400  # ms
+TOUCH_LATENCY_TARGET_MS = cfg.get("touch_latency_ms", 50)
+
+def record_touches(touches):
+    """Touch-to-redraw latency of the gestures handled in this frame."""
+    for g in touches:
+        perf.record_touch(g.t)
+
+def main():
+    global current_view, backlight_on, show_hud
+
+    # start updater thread; the boot animation waits for this first pass
+    fetch_sched.refresh_now()
+    t = threading.Thread(target=fetch_sched.run, daemon=True)
+    t.start()
+
+    if HSL_OFFLINE:
+        threading.Thread(target=load_hsl_timetable, daemon=True).start()
+
+    if mirror:
+        mirror.start()
+
+    # boot animation (simple)
+    if cfg.get("skip_boot_animation", False):
+        animation = None
+        boot_anim = None
+    else:
+        animation = boot_anim = start_animation(BOOT_STEPS)
+
+    # Service restart wake behavior
+    set_backlight(True)
+    backlight_on = True
+    last_activity = pygame.time.get_ticks()
+    overrode_schedule = True
+
+    # touch / mouse gestures, acted on in the iteration that completes them
+    gestures = GestureRecognizer(
+        (WIDTH, HEIGHT),
+        double_tap_ms=cfg.get("double_tap_ms", DOUBLE_TAP_TIME),
+        long_press_ms=cfg.get("long_press_ms", 700),
+    )
+
+    # activity tracking for timeout
+    last_activity = pygame.time.get_ticks()
+
+    # True once the blank frame has been pushed after the backlight went off
+    screen_dark = False
+
+    while True:
+        events = frame_sched.wait()
+        now_ticks = pygame.time.get_ticks()
+        frame_sched.begin_frame(now_ticks)
+        perf.start()
+        touches = []
+
+        for ev in events:
+            if ev.type in (pygame.FINGERDOWN, pygame.MOUSEBUTTONDOWN):
+                last_activity = now_ticks
+
+                # If screen is OFF → wake it up and skip toggling behavior
+                if ev.type == pygame.FINGERDOWN and not backlight_on:
+                    set_backlight(True)
+                    backlight_on = True
+                    overrode_schedule = True  # prevent instant turn-off
+                    fetch_sched.refresh_now()
+                    if cfg.get("greet_on_wake", False):
+                        animation = start_animation(GREETING_STEPS)
+                    # this touch only wakes the screen, it is no gesture
+                    gestures.feed(ev, now_ticks, time.perf_counter())
+                    gestures.cancel()
+                    continue
+
+            if not backlight_on:
+                continue  # ignore input while waking
+            touches.extend(gestures.feed(ev, now_ticks, time.perf_counter()))
+        touches.extend(gestures.poll(now_ticks, time.perf_counter()))
+
+        for g in touches:
+            # any gesture during the boot / greeting animation just skips it
+            if animation is not None:
+                animation = None
+                dirty.invalidate()
+                continue
+
+            if g.kind == DOUBLE_TAP and HUD_CORNER.collidepoint(g.pos):
+                show_hud = not show_hud  # hidden gesture: corner double-tap
+            elif g.kind in (DOUBLE_TAP, SWIPE_LEFT, SWIPE_RIGHT):
+                step = -1 if g.kind == SWIPE_RIGHT else 1
+                current_view = (current_view + step) % NUM_VIEWS  # HSL, WX, ELEC, DEP, ARR
+                for scroller in BOARD_SCROLLERS:
+                    scroller.restart(now_ticks)
+            elif g.kind == LONG_PRESS:
+                fetch_sched.refresh_now()  # fetch everything now
+                continue
+            else:
+                continue
+            dirty.invalidate()  # whole screen changes on a view switch / HUD toggle
+
+        perf.lap("events")
+
+        # ---- Backlight scheduling / timeout with override ----
+        idle_ms = now_ticks - last_activity
+
+        if overrode_schedule:
+            # Ignore schedule until override timeout
+            if idle_ms > BACKLIGHT_TIMEOUT:
+                overrode_schedule = False
+        else:
+            # Normal time-based scheduling
+            if in_on_window():
+                set_backlight(True)
+            else:
+                if backlight_on and idle_ms > BACKLIGHT_TIMEOUT:
+                    set_backlight(False)
+        perf.lap("backlight")
+
+        # If backlight is OFF → go idle: blank the panel once, then sleep until
+        # a touch or the next scheduled on-window, rendering nothing meanwhile
+        if not backlight_on:
+            if not screen_dark:
+                screen.fill(BLACK)
+                pygame.display.flip()
+                if mirror:
+                    mirror.capture(screen, None)
+                dirty.invalidate()  # repaint everything once we wake up
+                screen_dark = True
+            frame_sched.idle_until(now_ticks + ms_until_window_start())
+            continue
+
+        screen_dark = False
+
+        # Boot / greeting animation. Boot ends as soon as its text is typed out
+        # and the first data pass is in, rather than sitting out the last pause.
+        if animation is not None:
+            done = animation.done(now_ticks)
+            if animation is boot_anim and animation.typed(now_ticks) and not fetch_sched.refreshing():
+                done = True
+            if not done:
+                draw_animation(animation, now_ticks)
+                if animation is boot_anim and animation.typed(now_ticks):
+                    frame_sched.request_in(100)  # poll for the first data
+                present()
+                record_touches(touches)
+                continue
+            animation = None
+            dirty.invalidate()
+
+        # Normal drawing when backlight is ON and not in greeting
+        render_frame(current_view)
+        perf.end()
+        record_touches(touches)
+        schedule_next_frame(current_view, now_ticks)
+        long_press_at = gestures.next_deadline()
+        if long_press_at is not None:
+            frame_sched.request_at(long_press_at)
+
+
+if __name__ == "__main__":
+    main()